@@ -0,0 +1,314 @@
+"""
+compare benchmark results of main.py against a baseline.
+
+every results file is one run of main.py: one row per (worker_size, task_size),
+columns r{k}, solved{k}, t{k} for the k-th solver. passing several files per side
+gives repeated runs, rows are then tested one by one.
+
+1. rows are matched by (worker_size, task_size, solver).
+2. per row, with at least two runs on both sides, a one-sided welch t-test checks
+   whether the new runs are slower (t) or earn less (r), p-values are holm corrected.
+   deterministic values (no variance on either side) are significant as soon as they differ.
+3. per solver, a one-sided sign test over the matched rows checks whether the new runs are
+   worse on most instance sizes, it works with a single run per side.
+4. changes under the tolerances are never regressions, timings under min_time are timer noise.
+
+exits with 1 if a regression is found, with 2 if no row was compared or, unless allowed,
+if some rows are only in one side, e.g.
+    python ./scripts/compare_results.py --baseline base_1.csv base_2.csv base_3.csv --new new_1.csv new_2.csv new_3.csv
+"""
+import argparse
+import math
+import re
+import sys
+from typing import List, Tuple, Optional
+
+import numpy as np
+import pandas
+
+# solver names by column suffix, see src/main.py
+SOLVERS = {
+    1: "greedy_by_reward",
+    2: "greedy_by_reward_per_workload",
+    3: "mip",
+    4: "batch_mip",
+    5: "batch_with_backlog_mip",
+    6: "auction",
+}
+KEYS = ["worker_size", "task_size", "solver"]
+# metric -> sign of a regression: times go up, rewards go down
+METRICS = {"t": 1.0, "r": -1.0}
+
+
+def load_results(paths: List[str]) -> pandas.DataFrame:
+    """
+    :return: one row per (run, worker_size, task_size, solver), with the columns r, solved, t
+    """
+    frames = list()
+    for run, path in enumerate(paths):
+        df = pandas.read_csv(path)
+        # first results only had square instances
+        if "instance_size" in df.columns and "worker_size" not in df.columns:
+            df["worker_size"] = df["instance_size"]
+            df["task_size"] = df["instance_size"]
+
+        solvers = sorted(
+            {int(m.group(2)) for m in (re.fullmatch(r"(r|solved|t)(\d+)", c) for c in df.columns) if m}
+        )
+        for k in solvers:
+            columns = {f"{x}{k}": x for x in ("r", "solved", "t") if f"{x}{k}" in df.columns}
+            frame = df[["worker_size", "task_size"] + list(columns)].rename(columns=columns)
+            frame.insert(0, "run", run)
+            frame.insert(3, "solver", k)
+            frames.append(frame)
+    if len(frames) == 0:
+        raise ValueError("no results columns found")
+    return pandas.concat(frames, ignore_index=True)
+
+
+def betainc(a: float, b: float, x: float) -> float:
+    """
+    regularized incomplete beta function, continued fraction (modified lentz).
+    """
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    if x > (a + 1.0) / (a + b + 2.0):
+        return 1.0 - betainc(b, a, 1.0 - x)
+
+    front = math.exp(
+        math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)
+    ) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    f = d
+    for m in range(1, 300):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            f *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return front * f
+
+
+def t_sf(t: float, df: float) -> float:
+    """
+    :return: P(T > t) of a student t distribution with df degrees of freedom
+    """
+    tail = 0.5 * betainc(df / 2.0, 0.5, df / (df + t * t))
+    return tail if t > 0 else 1.0 - tail
+
+
+def welch_test(base: np.ndarray, new: np.ndarray, sign: float) -> float:
+    """
+    @param sign: 1 if larger new values are worse, -1 otherwise.
+    :return: one-sided p-value of the new values being worse
+    """
+    diff = sign * (new.mean() - base.mean())
+    v_base = base.var(ddof=1) / len(base)
+    v_new = new.var(ddof=1) / len(new)
+    se = math.sqrt(v_base + v_new)
+    if se == 0.0:
+        return 0.0 if diff > 0 else 1.0
+    df = (v_base + v_new) ** 2 / (
+        v_base ** 2 / (len(base) - 1) + v_new ** 2 / (len(new) - 1)
+    )
+    return t_sf(diff / se, df)
+
+
+def sign_test(worse: int, better: int) -> float:
+    """
+    :return: one-sided p-value of at least worse rows out of worse + better getting worse by chance
+    """
+    n = worse + better
+    if n == 0:
+        return 1.0
+    return sum(math.comb(n, k) for k in range(worse, n + 1)) / 2 ** n
+
+
+def holm(p_values: List[float]) -> List[float]:
+    """
+    :return: holm-bonferroni adjusted p-values, in the same order
+    """
+    order = sorted(range(len(p_values)), key=lambda i: p_values[i])
+    ret = [1.0] * len(p_values)
+    running = 0.0
+    for rank, i in enumerate(order):
+        running = max(running, min(1.0, (len(p_values) - rank) * p_values[i]))
+        ret[i] = running
+    return ret
+
+
+def relative_change(base: float, new: float) -> float:
+    if base == 0.0:
+        return 0.0 if new == 0.0 else math.copysign(math.inf, new)
+    return (new - base) / abs(base)
+
+
+def compare(
+    baseline: pandas.DataFrame,
+    new: pandas.DataFrame,
+    alpha: float = 0.05,
+    time_tolerance: float = 0.1,
+    reward_tolerance: float = 0.001,
+    min_time: float = 0.01,
+) -> Tuple[pandas.DataFrame, pandas.DataFrame]:
+    """
+    @param alpha: significance level, of the holm corrected p-values for rows.
+    @param time_tolerance: relative slow down under which time is never a regression.
+    @param reward_tolerance: relative reward loss under which reward is never a regression.
+    @param min_time: seconds, timings where both means are under it are not compared.
+    :return: one row per (worker_size, task_size, solver, metric), one row per (solver, metric)
+    """
+    tolerances = {"t": time_tolerance, "r": reward_tolerance}
+    base_groups = {k: g for k, g in baseline.groupby(KEYS)}
+    new_groups = {k: g for k, g in new.groupby(KEYS)}
+
+    rows = list()
+    for key in sorted(base_groups.keys() & new_groups.keys()):
+        for metric, sign in METRICS.items():
+            base_values = base_groups[key][metric].dropna().to_numpy(dtype=np.float64)
+            new_values = new_groups[key][metric].dropna().to_numpy(dtype=np.float64)
+            if len(base_values) == 0 or len(new_values) == 0:
+                continue
+            base_mean, new_mean = float(base_values.mean()), float(new_values.mean())
+            if metric == "t" and max(base_mean, new_mean) < min_time:
+                continue
+
+            change = relative_change(base_mean, new_mean)
+            p_value: Optional[float] = None
+            if len(base_values) > 1 and len(new_values) > 1:
+                p_value = welch_test(base_values, new_values, sign)
+            rows.append({
+                "worker_size": key[0],
+                "task_size": key[1],
+                "solver": key[2],
+                "metric": metric,
+                "base": base_mean,
+                "new": new_mean,
+                "base_runs": len(base_values),
+                "new_runs": len(new_values),
+                "change": change,
+                # worse beyond the tolerance, the sign test counts these
+                "worse": sign * change > tolerances[metric],
+                "better": -sign * change > tolerances[metric],
+                "p_value": p_value,
+            })
+    columns = list(rows[0]) if len(rows) > 0 else KEYS + ["metric", "change", "worse", "better", "p_value"]
+    details = pandas.DataFrame(rows, columns=columns)
+
+    # holm over every row test of the comparison
+    tested = details["p_value"].notna()
+    details["p_adjusted"] = np.nan
+    if tested.any():
+        details.loc[tested, "p_adjusted"] = holm(details.loc[tested, "p_value"].astype(float).tolist())
+    details["regression"] = details["worse"] & (details["p_adjusted"] < alpha)
+
+    summary = list()
+    for (solver, metric), g in details.groupby(["solver", "metric"]):
+        worse, better = int(g["worse"].sum()), int(g["better"].sum())
+        # geometric mean of the new / base ratios, over the rows where it is defined
+        ratios = (g["new"] / g["base"]).replace([np.inf, -np.inf], np.nan)
+        ratios = ratios[ratios > 0]
+        p_value = sign_test(worse, better)
+        summary.append({
+            "solver": solver,
+            "metric": metric,
+            "rows": len(g),
+            "worse": worse,
+            "better": better,
+            "ratio": float(np.exp(np.log(ratios).mean())) if len(ratios) > 0 else np.nan,
+            "p_value": p_value,
+            "row_regressions": int(g["regression"].sum()),
+            "regression": p_value < alpha or bool(g["regression"].any()),
+        })
+    summary = pandas.DataFrame(
+        summary,
+        columns=["solver", "metric", "rows", "worse", "better", "ratio", "p_value", "row_regressions", "regression"],
+    )
+    return details, summary
+
+
+def report(details: pandas.DataFrame, summary: pandas.DataFrame, verbose: bool = False) -> str:
+    """
+    per solver and metric summary, then the regressed rows (every row if verbose).
+    """
+    lines = list()
+    summary = summary.assign(
+        solver=summary["solver"].map(lambda k: SOLVERS.get(k, f"solver{k}")),
+        flag=np.where(summary["regression"], "REGRESSION", ""),
+    ).drop(columns="regression")
+    lines.append(summary.to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+
+    shown = details if verbose else details[details["regression"]]
+    if len(shown) > 0:
+        shown = shown.assign(
+            solver=shown["solver"].map(lambda k: SOLVERS.get(k, f"solver{k}")),
+            change=shown["change"].map(lambda x: f"{x:+.1%}"),
+        ).drop(columns=["worse", "better"])
+        lines.append("")
+        lines.append(shown.to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+
+    n = int(summary["flag"].astype(bool).sum())
+    lines.append("")
+    lines.append(
+        f"{len(details)} rows compared, {int(details['regression'].sum())} row regressions, "
+        f"{n} solver / metric regressions"
+    )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="compare main.py results against a baseline")
+    parser.add_argument("--baseline", nargs="+", required=True, help="baseline results, one file per run")
+    parser.add_argument("--new", nargs="+", required=True, help="new results, one file per run")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--time-tolerance", type=float, default=0.1)
+    parser.add_argument("--reward-tolerance", type=float, default=0.001)
+    parser.add_argument("--min-time", type=float, default=0.01)
+    parser.add_argument("--output", help="writes every compared row to this csv")
+    parser.add_argument("--verbose", action="store_true", help="reports every row, not only the regressions")
+    parser.add_argument(
+        "--allow-unmatched",
+        action="store_true",
+        help="passes when some (worker_size, task_size, solver) rows are only in one side",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline)
+    new = load_results(args.new)
+    details, summary = compare(
+        baseline,
+        new,
+        alpha=args.alpha,
+        time_tolerance=args.time_tolerance,
+        reward_tolerance=args.reward_tolerance,
+        min_time=args.min_time,
+    )
+    if args.output is not None:
+        details.to_csv(args.output, index=False)
+    print(report(details, summary, args.verbose))
+
+    base_keys = set(map(tuple, baseline[KEYS].drop_duplicates().to_numpy().tolist()))
+    new_keys = set(map(tuple, new[KEYS].drop_duplicates().to_numpy().tolist()))
+    if base_keys != new_keys:
+        print(
+            f"unmatched: {len(base_keys - new_keys)} baseline rows, {len(new_keys - base_keys)} new rows"
+        )
+
+    # a gate that compared nothing must not pass
+    if len(details) == 0 or (base_keys != new_keys and not args.allow_unmatched):
+        return 2
+    return 1 if summary["regression"].any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
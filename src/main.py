@@ -1,8 +1,13 @@
+import argparse
 import os
 from statistics import mean
 import pandas as pd
 import pathlib
 import random
+import sys
+import time
+from typing import List, Tuple, Optional
+from src.pkgs.sovlers.auction_solver import AuctionSolver
 from src.pkgs.sovlers.batch_mip_solver import BatchMIPSolver
 from src.pkgs.sovlers.batch_with_backlog_mip_solver import BatchWithBacklogMIPSolver
 from src.pkgs.sovlers.greedy_by_reward_per_workload_solver import (
@@ -10,12 +15,93 @@ from src.pkgs.sovlers.greedy_by_reward_per_workload_solver import (
 )
 from src.pkgs.sovlers.greedy_by_reward_solver import GreedyByRewardSolver
 from src.pkgs.sovlers.mip_solver import MIPSolver
+from src.pkgs.sovlers.streaming_mip_solver import StreamingMIPSolver
+from src.pkgs.sovlers.base_solver import BaseSolver
+from src.pkgs.sovlers.solution_cache import SolutionCache
+from src.pkgs.profiling.profiler import Profiler
 from src.pkgs.structs.task import Task
 from src.pkgs.structs.worker import Worker
 
 RESOURCE_PATH = os.path.join(
     pathlib.Path(__file__).parent, "../resources/processed_data"
 )
+CACHE_PATH = os.path.join(pathlib.Path(__file__).parent, "../resources/cache")
+
+RESULTS_PATH = os.path.join(pathlib.Path(__file__).parent, "../resources/results")
+# set from --output-dir
+PROFILES_PATH = os.path.join(RESULTS_PATH, "profiles")
+# set from --streaming-threshold
+STREAMING_THRESHOLD = None
+
+# per-phase timings of every solver, collected with --profile
+profile_records = list()
+
+
+def measured(t: List[float]) -> float:
+    """
+    :return: mean of the measured timings, nan if every result came from the cache
+    """
+    return mean(t) if len(t) > 0 else float("nan")
+
+
+def make_mip_solver(workers: List[Worker], tasks: List[Task]) -> MIPSolver:
+    """
+    StreamingMIPSolver from STREAMING_THRESHOLD worker x task pairs on, MIPSolver otherwise.
+    """
+    if STREAMING_THRESHOLD is not None and len(workers) * len(tasks) >= STREAMING_THRESHOLD:
+        return StreamingMIPSolver(workers=workers, tasks=tasks)
+    return MIPSolver(workers=workers, tasks=tasks)
+
+
+def read_instance(instance_id: int, i: int) -> Tuple[List[Worker], List[Task]]:
+    # read workers
+    workers = list()
+    for w_id, pd_ser in pd.read_csv(
+            os.path.join(RESOURCE_PATH, f"worker_{instance_id}/workers{i}.csv")
+    ).iterrows():
+        workers.append(Worker.from_pd_series(w_id, pd_ser))
+
+    # read tasks
+    tasks = list()
+    for t_id, pd_ser in pd.read_csv(
+            os.path.join(RESOURCE_PATH, f"task_{instance_id}/tasks{i}.csv")
+    ).iterrows():
+        tasks.append(Task.from_pd_series(t_id, pd_ser))
+    return workers, tasks
+
+
+def compare_auction(instance_id: int, size: Optional[int] = None, eps: Tuple[float, ...] = (0.01, 0.1)):
+    """
+    reward of the auction solver relative to the mip solver.
+    @param size: first workers and tasks of the instances, the full instances if None.
+    """
+    rows = list()
+    for i in range(3):
+        workers, tasks = read_instance(instance_id, i)
+        workers, tasks = workers[:size], tasks[:size]
+        r_mip, solved_mip, t_mip, _ = make_mip_solver(workers, tasks).solve()
+        for _eps in eps:
+            _r, _solved, _t, _ = AuctionSolver(workers=workers, tasks=tasks, eps=_eps).solve()
+            rows.append({
+                "instance_id": instance_id,
+                "worker_size": len(workers),
+                "task_size": len(tasks),
+                "run": i,
+                "eps": _eps,
+                "mip_reward": r_mip,
+                "mip_solved": solved_mip,
+                "mip_time": t_mip,
+                "auction_reward": _r,
+                "auction_solved": _solved,
+                "auction_time": _t,
+                # nan if the mip failed or earned nothing
+                "relative_reward": _r / r_mip if r_mip > 0 else float("nan"),
+            })
+            print(
+                f"instance {instance_id}/{i}, eps {_eps}: auction {_r} in {_t}s, "
+                f"mip {r_mip} in {t_mip}s, relative reward {rows[-1]['relative_reward']}"
+            )
+    return rows
 
 
 def solve(instance_id: int, worker_size: int, task_size: int):
@@ -25,194 +111,257 @@ def solve(instance_id: int, worker_size: int, task_size: int):
     r_3, solved_3, t_3 = [], [], []
     r_4, solved_4, t_4 = [], [], []
     r_5, solved_5, t_5 = [], [], []
+    r_6, solved_6, t_6 = [], [], []
+    # runs served from the cache per solver, their timings are not measurements
+    cached = {k: 0 for k in range(1, 7)}
 
     tmp = {"worker_size": worker_size, "task_size": task_size}
 
     for i in range(3):
-        # read workers
-        workers = list()
-        for w_id, pd_ser in pd.read_csv(
-                os.path.join(RESOURCE_PATH, f"worker_{instance_id}/workers{i}.csv")
-        ).iterrows():
-            workers.append(Worker.from_pd_series(w_id, pd_ser))
-
-        # read tasks
-        tasks = list()
-        for t_id, pd_ser in pd.read_csv(
-                os.path.join(RESOURCE_PATH, f"task_{instance_id}/tasks{i}.csv")
-        ).iterrows():
-            tasks.append(Task.from_pd_series(t_id, pd_ser))
+        workers, tasks = read_instance(instance_id, i)
 
         # solver 1
         greed_by_reward_solver = GreedyByRewardSolver(
             workers=workers[:worker_size], tasks=tasks[:task_size]
         )
-        _r, _solved, _t = greed_by_reward_solver.solve()
+        _r, _solved, _t, _ = greed_by_reward_solver.solve()
         r_1.append(_r)
         solved_1.append(_solved)
-        t_1.append(_t)
+        if greed_by_reward_solver.cached:
+            cached[1] += 1
+        else:
+            t_1.append(_t)
 
         # solver 2
         greed_by_reward_per_workload_solver = GreedyByRewardPerWorkloadSolver(
             workers=workers[:worker_size], tasks=tasks[:task_size]
         )
-        _r, _solved, _t = greed_by_reward_per_workload_solver.solve()
+        _r, _solved, _t, _ = greed_by_reward_per_workload_solver.solve()
         r_2.append(_r)
         solved_2.append(_solved)
-        t_2.append(_t)
+        if greed_by_reward_per_workload_solver.cached:
+            cached[2] += 1
+        else:
+            t_2.append(_t)
 
         # solver 3
-        mip_solver = MIPSolver(
-            workers=workers[:worker_size], tasks=tasks[:task_size]
-        )
+        mip_solver = make_mip_solver(workers[:worker_size], tasks[:task_size])
         _r, _solved, _t, _ = mip_solver.solve()
         if _r >= 0:
             r_3.append(_r)
             solved_3.append(_solved)
-            t_3.append(_t)
+            if mip_solver.cached:
+                cached[3] += 1
+            else:
+                t_3.append(_t)
 
         # solver 4
         batch_mip_solver = BatchMIPSolver(
             n=3, workers=workers[:worker_size], tasks=tasks[:task_size]
         )
-        _r, _solved, _t = batch_mip_solver.solve()
+        _r, _solved, _t, _ = batch_mip_solver.solve()
         if _r >= 0:
             r_4.append(_r)
             solved_4.append(_solved)
-            t_4.append(_t)
+            if batch_mip_solver.cached:
+                cached[4] += 1
+            else:
+                t_4.append(_t)
 
         # solver 5
         batch_mip_solver = BatchWithBacklogMIPSolver(
             n=3, backlog_size=max(worker_size, task_size) // 9, workers=workers[:worker_size], tasks=tasks[:task_size]
         )
-        _r, _solved, _t = batch_mip_solver.solve()
+        _r, _solved, _t, _ = batch_mip_solver.solve()
         if _r >= 0:
             r_5.append(_r)
             solved_5.append(_solved)
-            t_5.append(_t)
+            if batch_mip_solver.cached:
+                cached[5] += 1
+            else:
+                t_5.append(_t)
+
+        # solver 6
+        auction_solver = AuctionSolver(
+            workers=workers[:worker_size], tasks=tasks[:task_size]
+        )
+        _r, _solved, _t, _ = auction_solver.solve()
+        r_6.append(_r)
+        solved_6.append(_solved)
+        if auction_solver.cached:
+            cached[6] += 1
+        else:
+            t_6.append(_t)
 
     print("")
     print(f"worker size: {worker_size}, task size: {task_size}")
     print("#########################")
     print(f"greedy by reward solver:")
-    print(f"avg_reward: {mean(r_1)}, avg_time: {mean(t_1)}, avg_solved: {mean(solved_1)}")
+    print(f"avg_reward: {mean(r_1)}, avg_time: {measured(t_1)}, avg_solved: {mean(solved_1)}")
     print("#########################")
     print(f"greedy by reward per workload solver:")
-    print(f"avg_reward: {mean(r_2)}, avg_time: {mean(t_2)}, avg_solved: {mean(solved_2)}")
+    print(f"avg_reward: {mean(r_2)}, avg_time: {measured(t_2)}, avg_solved: {mean(solved_2)}")
     print("#########################")
     print(f"MIP solver:")
-    print(f"avg_reward: {mean(r_3)}, avg_time: {mean(t_3)}, avg_solved: {mean(solved_3)}")
+    print(f"avg_reward: {mean(r_3)}, avg_time: {measured(t_3)}, avg_solved: {mean(solved_3)}")
     print(f"solved: {len(r_3)}")
     print("#########################")
     print(f"Batch MIP solver:")
-    print(f"avg_reward: {mean(r_4)}, avg_time: {mean(t_4)}, avg_solved: {mean(solved_4)}")
+    print(f"avg_reward: {mean(r_4)}, avg_time: {measured(t_4)}, avg_solved: {mean(solved_4)}")
     print(f"solved: {len(r_4)}")
     print("#########################")
     print(f"Batch with backlog MIP solver:")
-    print(f"avg_reward: {mean(r_5)}, avg_time: {mean(t_5)}, avg_solved: {mean(solved_5)}")
+    print(f"avg_reward: {mean(r_5)}, avg_time: {measured(t_5)}, avg_solved: {mean(solved_5)}")
     print(f"solved: {len(r_5)}")
     print("#########################")
+    print(f"Auction solver:")
+    print(f"avg_reward: {mean(r_6)}, avg_time: {measured(t_6)}, avg_solved: {mean(solved_6)}")
+    print(f"reward relative to MIP solver: {mean(r_6) / mean(r_3) if mean(r_3) > 0 else float('nan')}")
+    print("#########################")
+
+    for x in BaseSolver.profiler.records():
+        profile_records.append({"worker_size": worker_size, "task_size": task_size, **x})
+    if BaseSolver.profiler.cprofile:
+        BaseSolver.profiler.dump_profiles(os.path.join(PROFILES_PATH, f"{worker_size}_{task_size}"))
+    BaseSolver.profiler.reset()
 
     tmp["r1"] = mean(r_1)
     tmp["solved1"] = mean(solved_1)
-    tmp["t1"] = mean(t_1)
+    tmp["t1"] = measured(t_1)
+    tmp["cached1"] = cached[1]
 
     tmp["r2"] = mean(r_2)
     tmp["solved2"] = mean(solved_2)
-    tmp["t2"] = mean(t_2)
+    tmp["t2"] = measured(t_2)
+    tmp["cached2"] = cached[2]
 
     tmp["r3"] = mean(r_3)
     tmp["solved3"] = mean(solved_3)
-    tmp["t3"] = mean(t_3)
+    tmp["t3"] = measured(t_3)
+    tmp["cached3"] = cached[3]
 
     tmp["r4"] = mean(r_4)
     tmp["solved4"] = mean(solved_4)
-    tmp["t4"] = mean(t_4)
+    tmp["t4"] = measured(t_4)
+    tmp["cached4"] = cached[4]
 
     tmp["r5"] = mean(r_5)
     tmp["solved5"] = mean(solved_5)
-    tmp["t5"] = mean(t_5)
+    tmp["t5"] = measured(t_5)
+    tmp["cached5"] = cached[5]
+
+    tmp["r6"] = mean(r_6)
+    tmp["solved6"] = mean(solved_6)
+    tmp["t6"] = measured(t_6)
+    tmp["cached6"] = cached[6]
 
     return tmp
 
 
 if __name__ == "__main__":
-    res = {
-        "worker_size": list(),
-        "task_size": list(),
-        "r1": list(),
-        "solved1": list(),
-        "t1": list(),
-        "r2": list(),
-        "solved2": list(),
-        "t2": list(),
-        "r3": list(),
-        "solved3": list(),
-        "t3": list(),
-        "r4": list(),
-        "solved4": list(),
-        "t4": list(),
-        "r5": list(),
-        "solved5": list(),
-        "t5": list()
-    }
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="serve identical instances from resources/cache, their timings are reported as cached{k}",
+    )
+    parser.add_argument("--profile", action="store_true", help="export per-phase solver timings")
+    parser.add_argument(
+        "--cprofile", action="store_true", help="also dump a cProfile of every solver per instance size"
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="also record the peak traced memory of every solver"
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=os.path.join(RESULTS_PATH, time.strftime("run_%Y%m%d_%H%M%S")),
+        help="directory of the results, a new one per run by default, existing results are never overwritten",
+    )
+    parser.add_argument(
+        "--auction-vs-mip",
+        action="store_true",
+        help="only compare the auction solver to the mip solver on the 100 to 500 instances",
+    )
+    parser.add_argument(
+        "--auction-vs-mip-size",
+        type=int,
+        help="first workers and tasks of the instances compared by --auction-vs-mip, the full instances by default",
+    )
+    parser.add_argument(
+        "--streaming-threshold",
+        type=int,
+        help="solve the instances with at least this many worker x task pairs with the streaming mip solver",
+    )
+    args = parser.parse_args()
+    STREAMING_THRESHOLD = args.streaming_threshold
+
+    auction_path = os.path.join(args.output_dir, "auction_vs_mip.csv")
+    fix_w_path = os.path.join(args.output_dir, "result_fix_w.csv")
+    fix_t_path = os.path.join(args.output_dir, "result_fix_t.csv")
+    profile_path = os.path.join(args.output_dir, "profile.csv")
+    PROFILES_PATH = os.path.join(args.output_dir, "profiles")
+    existing = [
+        x for x in (fix_w_path, fix_t_path, profile_path, PROFILES_PATH, auction_path) if os.path.exists(x)
+    ]
+    if len(existing) > 0:
+        sys.exit(f"results already exist, choose another --output-dir: {', '.join(existing)}")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.cache:
+        # identical instances are solved once across runs and sweeps, until the solver code changes
+        BaseSolver.cache = SolutionCache(CACHE_PATH)
+    BaseSolver.profiler = Profiler(
+        enabled=args.profile or args.cprofile or args.trace_memory,
+        cprofile=args.cprofile,
+        trace_memory=args.trace_memory,
+    )
+
+    if args.auction_vs_mip:
+        res = list()
+        for x in range(100, 600, 100):
+            res += compare_auction(instance_id=x, size=args.auction_vs_mip_size)
+        res = pd.DataFrame(res)
+        res.to_csv(auction_path, index=False)
+        print(res.groupby(["instance_id", "eps"])["relative_reward"].mean().to_string())
+        sys.exit(0)
+
+    res = list()
 
     for x in [50]:
         for y in range(10, 110, 10):
             _res = solve(instance_id=100, worker_size=x, task_size=y)
-            for k in res.keys():
-                res[k].append(_res[k])
+            res.append(_res)
 
     for x in [100]:
         for y in range(50, 160, 10):
             _res = solve(instance_id=200, worker_size=x, task_size=y)
-            for k in res.keys():
-                res[k].append(_res[k])
+            res.append(_res)
 
     for x in [150]:
         for y in range(100, 210, 10):
             _res = solve(instance_id=200, worker_size=x, task_size=y)
-            for k in res.keys():
-                res[k].append(_res[k])
-
-    pd.DataFrame(res).to_csv("../resources/results/result_oct_21_fix_w.csv", index=False)
-
-    res = {
-        "worker_size": list(),
-        "task_size": list(),
-        "r1": list(),
-        "solved1": list(),
-        "t1": list(),
-        "r2": list(),
-        "solved2": list(),
-        "t2": list(),
-        "r3": list(),
-        "solved3": list(),
-        "t3": list(),
-        "r4": list(),
-        "solved4": list(),
-        "t4": list(),
-        "r5": list(),
-        "solved5": list(),
-        "t5": list()
-    }
+            res.append(_res)
+
+    pd.DataFrame(res).to_csv(fix_w_path, index=False)
+
+    res = list()
 
     for x in [50]:
         for y in range(10, 110, 10):
             _res = solve(instance_id=100, worker_size=y, task_size=x)
-            for k in res.keys():
-                res[k].append(_res[k])
+            res.append(_res)
 
     for x in [100]:
         for y in range(50, 160, 10):
             _res = solve(instance_id=200, worker_size=y, task_size=x)
-            for k in res.keys():
-                res[k].append(_res[k])
+            res.append(_res)
 
     for x in [150]:
         for y in range(100, 210, 10):
             _res = solve(instance_id=200, worker_size=y, task_size=x)
-            for k in res.keys():
-                res[k].append(_res[k])
+            res.append(_res)
+
+    pd.DataFrame(res).to_csv(fix_t_path, index=False)
 
-    pd.DataFrame(res).to_csv("../resources/results/result_oct_21_fix_t.csv", index=False)
+    if BaseSolver.profiler.enabled:
+        pd.DataFrame(profile_records).to_csv(profile_path, index=False)
@@ -0,0 +1,155 @@
+import cProfile
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import List, Dict, Tuple, Any, Iterator
+
+
+class Profiler:
+    """
+    named timers, counters and gauges for solver hot paths.
+
+    1. disabled by default, timers and counters are no-ops then.
+    2. entries are keyed by the scope stack, e.g. "BatchMIPSolver/MIPSolver".
+    3. cProfile and tracemalloc are captured around the outermost scope only.
+    4. thread safe: every thread has its own scope stack, entries are merged under a lock.
+       tracemalloc is process wide, the peak of overlapping outermost scopes is shared.
+    """
+
+    def __init__(self, enabled: bool = False, cprofile: bool = False, trace_memory: bool = False):
+        """
+        @param enabled: collect timers and counters.
+        @param cprofile: capture a cProfile of every outermost scope.
+        @param trace_memory: record the peak traced memory of every outermost scope.
+        """
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.trace_memory = trace_memory
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # outermost scopes tracing memory at the moment
+        self._tracing = 0
+        # (scope, name) -> [total seconds, calls]
+        self.timers: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0.0, 0])
+        # (scope, name) -> total
+        self.counters: Dict[Tuple[str, str], float] = defaultdict(float)
+        # (scope, name) -> max
+        self.gauges: Dict[Tuple[str, str], float] = dict()
+        # scope -> accumulated cProfile stats
+        self.profiles: Dict[str, pstats.Stats] = dict()
+
+    @property
+    def scopes(self) -> List[str]:
+        """
+        scope stack of the calling thread.
+        """
+        if not hasattr(self._local, "scopes"):
+            self._local.scopes = list()
+        return self._local.scopes
+
+    @property
+    def current_scope(self) -> str:
+        return "/".join(self.scopes)
+
+    @contextmanager
+    def scope(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        scopes = self.scopes
+        outermost = len(scopes) == 0
+        scopes.append(name)
+        scope = self.current_scope
+
+        profile = None
+        if outermost and self.cprofile:
+            profile = cProfile.Profile()
+            profile.enable()
+        if outermost and self.trace_memory:
+            with self._lock:
+                if self._tracing == 0:
+                    tracemalloc.start()
+                    tracemalloc.reset_peak()
+                self._tracing += 1
+
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                with self._lock:
+                    if scope in self.profiles:
+                        self.profiles[scope].add(profile)
+                    else:
+                        self.profiles[scope] = pstats.Stats(profile)
+            if outermost and self.trace_memory:
+                with self._lock:
+                    _, peak = tracemalloc.get_traced_memory()
+                    self._tracing -= 1
+                    if self._tracing == 0:
+                        tracemalloc.stop()
+                self.gauge("peak_memory", peak)
+            scopes.pop()
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                _ = self.timers[(self.current_scope, name)]
+                _[0] += elapsed
+                _[1] += 1
+
+    def count(self, name: str, n: float = 1):
+        if self.enabled:
+            with self._lock:
+                self.counters[(self.current_scope, name)] += n
+
+    def gauge(self, name: str, v: float):
+        """
+        keeps the max value seen.
+        """
+        if self.enabled:
+            key = (self.current_scope, name)
+            with self._lock:
+                self.gauges[key] = max(self.gauges.get(key, v), v)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """
+        :return: one flat record per timer, counter and gauge, ready for pd.DataFrame
+        """
+        ret = list()
+        with self._lock:
+            for (scope, name), (total, calls) in self.timers.items():
+                ret.append({"scope": scope, "name": name, "kind": "timer", "value": total, "calls": calls})
+            for (scope, name), total in self.counters.items():
+                ret.append({"scope": scope, "name": name, "kind": "counter", "value": total, "calls": None})
+            for (scope, name), v in self.gauges.items():
+                ret.append({"scope": scope, "name": name, "kind": "gauge", "value": v, "calls": None})
+        return ret
+
+    def dump_profiles(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            for scope, stats in self.profiles.items():
+                stats.dump_stats(os.path.join(path, scope.replace("/", ".") + ".prof"))
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+            self.gauges.clear()
+            self.profiles.clear()
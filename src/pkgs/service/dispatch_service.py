@@ -0,0 +1,227 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Tuple, List, Dict, Any, Optional, Type
+
+from src.pkgs.sovlers.base_solver import BaseSolver
+from src.pkgs.sovlers.mip_solver import MIPSolver
+from src.pkgs.sovlers.solution_cache import SolutionCache
+from src.pkgs.structs.task import Task
+from src.pkgs.structs.worker import Worker
+
+
+@dataclass
+class AssignmentRequest:
+    workers: List[Worker]
+    tasks: List[Task]
+    future: asyncio.Future
+    submitted: float = field(default_factory=time.perf_counter)
+
+
+def solve_batch(
+    solver: Type[BaseSolver], instances: List[Tuple[List[Worker], List[Task]]]
+) -> List[Tuple[float, float, float, List[Tuple[int, int]]]]:
+    """
+    solve a batch of instances in one executor job, module level so it can run in a process pool.
+    solvers get copies of the lists, some sort them in place while the callers still hold them.
+    """
+    return [solver(list(workers), list(tasks)).solve() for workers, tasks in instances]
+
+
+def solve_coalesced(
+    solver: Type[BaseSolver], instances: List[Tuple[List[Worker], List[Task]]]
+) -> Tuple[List[Tuple[float, float, float, List[Tuple[int, int]]]], int]:
+    """
+    solve_batch solving identical instances once, fingerprints are computed here so they stay off the event loop.
+    :return: one result per instance, each with its own assignments list, and the number of instances solved
+    """
+    groups: Dict[str, List[int]] = dict()
+    for i, (workers, tasks) in enumerate(instances):
+        key = SolutionCache.fingerprint(workers, tasks, solver.__name__, {})
+        groups.setdefault(key, list()).append(i)
+
+    results = [None] * len(instances)
+    solved = solve_batch(solver, [instances[x[0]] for x in groups.values()])
+    for indices, (reward, n_solved, t, assignments) in zip(groups.values(), solved):
+        for i in indices:
+            results[i] = (reward, n_solved, t, list(assignments))
+    return results, len(groups)
+
+
+class DispatchService:
+    """
+    asyncio front end of a solver.
+
+    1. requests are queued, submit() blocks or fails once the queue is full.
+    2. requests arriving within batch_window are coalesced into one batch, identical instances are solved once.
+    3. batches are solved off the event loop in the executor, results go back to each caller.
+    """
+
+    def __init__(
+        self,
+        solver: Type[BaseSolver] = MIPSolver,
+        max_queue_size: int = 100,
+        batch_window: float = 0.01,
+        max_batch_size: int = 16,
+        concurrency: int = 1,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        @param solver: solver class, called with (workers, tasks).
+        @param max_queue_size: queued requests before applying backpressure.
+        @param batch_window: seconds to wait for more requests after the first one of a batch.
+        @param max_batch_size: max requests per batch.
+        @param concurrency: batches solved at the same time.
+        @param executor: executor the batches run in, if None a thread pool of concurrency workers
+            is created in start() and shut down in stop().
+        """
+        self.solver = solver
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.concurrency = concurrency
+        self.executor = executor
+        self.owns_executor = executor is None
+        self.max_queue_size = max_queue_size
+
+        # created in start(), bound to the running loop
+        self.queue: Optional[asyncio.Queue] = None
+        self.consumer: Optional[asyncio.Task] = None
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.in_flight = set()
+
+        # metrics
+        self.latencies = deque(maxlen=1000)
+        self.solve_times = deque(maxlen=1000)
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.coalesced = 0
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self.slots = asyncio.Semaphore(self.concurrency)
+        if self.owns_executor:
+            self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        self.consumer = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        """
+        finish the queued requests and stop.
+        """
+        await self.queue.join()
+        self.consumer.cancel()
+        try:
+            await self.consumer
+        except asyncio.CancelledError:
+            pass
+        self.consumer = None
+        if self.owns_executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    async def submit(
+        self, workers: List[Worker], tasks: List[Task], block: bool = True
+    ) -> Tuple[float, float, float, List[Tuple[int, int]]]:
+        """
+        :param workers:
+        :param tasks:
+        :param block: wait for room in the queue, otherwise raise asyncio.QueueFull when saturated
+        :return: total reward, solved tasks, computation time in seconds, (worker id, task id) assignments
+        """
+        request = AssignmentRequest(workers, tasks, asyncio.get_running_loop().create_future())
+        if block:
+            await self.queue.put(request)
+        else:
+            try:
+                self.queue.put_nowait(request)
+            except asyncio.QueueFull:
+                self.rejected += 1
+                raise
+        self.requests += 1
+        return await request.future
+
+    def metrics(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "queue_depth": self.queue.qsize(),
+            "in_flight": len(self.in_flight),
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "coalesced": self.coalesced,
+            "latency_mean": statistics.mean(latencies) if latencies else None,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            "latency_max": latencies[-1] if latencies else None,
+            "solve_time_mean": statistics.mean(self.solve_times) if self.solve_times else None,
+        }
+
+    async def _consume(self):
+        while True:
+            batch = [await self.queue.get()]
+
+            # wait a bit for more requests
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self.slots.acquire()
+            task = asyncio.create_task(self._solve(batch))
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+
+    async def _solve(self, batch: List[AssignmentRequest]):
+        try:
+            # identical instances are solved once
+            instances = [(x.workers, x.tasks) for x in batch]
+            start = time.perf_counter()
+            results, n_solved = await asyncio.get_running_loop().run_in_executor(
+                self.executor, solve_coalesced, self.solver, instances
+            )
+            self.solve_times.append(time.perf_counter() - start)
+            self.batches += 1
+            self.coalesced += len(batch) - n_solved
+
+            now = time.perf_counter()
+            for request, result in zip(batch, results):
+                if not request.future.done():
+                    request.future.set_result(result)
+                self.latencies.append(now - request.submitted)
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+            self.slots.release()
+
+
+class LocalClient:
+    """
+    in-process client, starts and stops the service around an async with block.
+    """
+
+    def __init__(self, service: DispatchService):
+        self.service = service
+
+    async def __aenter__(self) -> "LocalClient":
+        await self.service.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.service.stop()
+
+    async def assign(
+        self, workers: List[Worker], tasks: List[Task]
+    ) -> Tuple[float, float, float, List[Tuple[int, int]]]:
+        return await self.service.submit(workers, tasks)
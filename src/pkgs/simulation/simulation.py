@@ -0,0 +1,232 @@
+import dataclasses
+import heapq
+import itertools
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Tuple, List, Dict, Any, Optional, Iterable, Callable
+
+from src.pkgs.sovlers.base_solver import BaseSolver
+from src.pkgs.sovlers.greedy_by_reward_solver import GreedyByRewardSolver
+from src.pkgs.structs.evaluator import SolutionEvaluator
+from src.pkgs.structs.task import Task
+from src.pkgs.structs.worker import Worker
+
+# event kinds, events at the same time are processed in this order
+RELEASE = 0
+ARRIVAL = 1
+EXPIRY = 2
+EPOCH = 3
+
+
+@dataclass(frozen=True)
+class EpochStats:
+    epoch: int
+    time: float
+    duration: float
+    # open tasks and free workers given to the solver
+    pending_tasks: int
+    free_workers: int
+    # teams formed at this epoch
+    assigned_tasks: int
+    assigned_workers: int
+    reward: float
+    # since the previous epoch
+    arrived_tasks: int
+    completed_tasks: int
+    expired_tasks: int
+    # wall clock seconds of the solver
+    solver_time: float
+
+    @property
+    def throughput(self) -> float:
+        """
+        completed tasks per unit of simulated time.
+        """
+        return self.completed_tasks / self.duration
+
+
+@dataclass(frozen=True)
+class SimulationReport:
+    epochs: List[EpochStats]
+
+    def records(self) -> List[Dict[str, Any]]:
+        """
+        one row per epoch, e.g. for a pandas DataFrame.
+        """
+        return [dict(dataclasses.asdict(x), throughput=x.throughput) for x in self.epochs]
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = sorted(x.solver_time for x in self.epochs)
+        duration = sum(x.duration for x in self.epochs)
+        return {
+            "epochs": len(self.epochs),
+            "reward": sum(x.reward for x in self.epochs),
+            "arrived": sum(x.arrived_tasks for x in self.epochs),
+            "assigned": sum(x.assigned_tasks for x in self.epochs),
+            "completed": sum(x.completed_tasks for x in self.epochs),
+            "expired": sum(x.expired_tasks for x in self.epochs),
+            "throughput": sum(x.completed_tasks for x in self.epochs) / duration if duration > 0 else None,
+            "latency_mean": statistics.mean(latencies) if latencies else None,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            "latency_max": latencies[-1] if latencies else None,
+        }
+
+
+class Simulation:
+    """
+    discrete-event simulation of a dispatch day, workers are reused.
+
+    1. tasks arrive over time, their deadline and expected time count from their arrival.
+    2. at every epoch the solver is called with the free workers and the open tasks,
+       the deadline and expected time of a task are shortened by its waiting time.
+    3. teams with a positive reward are committed, the other tasks stay open until they expire.
+    4. a team is busy until its finish time, then its workers are free again at the location of the task.
+    5. everything happens through an event heap, the pools are updated in place by the events.
+    """
+
+    def __init__(
+        self,
+        workers: Iterable[Worker],
+        arrivals: Iterable[Tuple[float, Task]],
+        solver: Callable[[List[Worker], List[Task]], BaseSolver] = GreedyByRewardSolver,
+        epoch_length: float = 1.0,
+        start: float = 0.0,
+    ):
+        """
+        @param workers: workers, free at start.
+        @param arrivals: (arrival time, task), task ids must be unique.
+        @param solver: solver class or factory, called with (workers, tasks) at every epoch.
+        @param epoch_length: simulated time between two solver calls.
+        @param start: simulated time of the start.
+        """
+        self.solver = solver
+        self.epoch_length = epoch_length
+        self.now = start
+        self.epoch = 0
+
+        # state
+        self.free: Dict[int, Worker] = {w.id: w for w in workers}
+        self.pending: Dict[int, Tuple[float, Task]] = dict()
+        self.busy_workers = 0
+        self.busy_tasks = 0
+
+        # event heap of (time, kind, seq, payload), seq keeps the heap from comparing payloads
+        self.events: List[Tuple[float, int, int, Any]] = list()
+        self.seq = itertools.count()
+        self.arrivals_left = 0
+        for arrival, t in arrivals:
+            self._push(arrival, ARRIVAL, t)
+            self.arrivals_left += 1
+        self._push(self.now + self.epoch_length, EPOCH, None)
+
+        # counters since the previous epoch
+        self.arrived = 0
+        self.completed = 0
+        self.expired = 0
+
+    def _push(self, at: float, kind: int, payload: Any):
+        heapq.heappush(self.events, (at, kind, next(self.seq), payload))
+
+    def done(self) -> bool:
+        return self.arrivals_left == 0 and len(self.pending) == 0 and self.busy_tasks == 0
+
+    def run(self, until: Optional[float] = None) -> SimulationReport:
+        """
+        @param until: simulated time to stop at, when every task is done or expired if None.
+        :return: stats of every epoch
+        """
+        epochs = list()
+        # up to the epoch reporting the last events
+        while not self.done() or self.arrived + self.completed + self.expired > 0:
+            if until is not None and self.events[0][0] > until:
+                break
+            at, kind, _, payload = heapq.heappop(self.events)
+            self.now = at
+
+            if kind == RELEASE:
+                t, team = payload
+                for w in team:
+                    self.free[w.id] = dataclasses.replace(w, lat=t.lat, lon=t.lon)
+                self.busy_workers -= len(team)
+                self.busy_tasks -= 1
+                self.completed += 1
+            elif kind == ARRIVAL:
+                self.pending[payload.id] = (at, payload)
+                self._push(at + payload.deadline, EXPIRY, payload.id)
+                self.arrivals_left -= 1
+                self.arrived += 1
+            elif kind == EXPIRY:
+                if self.pending.pop(payload, None) is not None:
+                    self.expired += 1
+            else:
+                epochs.append(self.dispatch())
+                self._push(at + self.epoch_length, EPOCH, None)
+        return SimulationReport(epochs)
+
+    def dispatch(self) -> EpochStats:
+        """
+        solve the current pools and commit the teams.
+        """
+        workers = list(self.free.values())
+        tasks = [self._remaining(arrival, t) for arrival, t in self.pending.values()]
+
+        assigned_tasks, assigned_workers, reward, solver_time = 0, 0, 0.0, 0.0
+        if len(workers) > 0 and len(tasks) > 0:
+            solver = self.solver(list(workers), list(tasks))
+            start = time.perf_counter()
+            _reward, _, _, assignments = solver.solve()
+            solver_time = time.perf_counter() - start
+
+            if _reward >= 0 and len(assignments) > 0:
+                # same reward model and metric as the solver, on our own task order
+                evaluation = SolutionEvaluator(
+                    workers, tasks, solver.reward_model, solver.distance
+                ).evaluate(assignments)
+                teams: Dict[int, List[Worker]] = dict()
+                for w_id, t_id in assignments:
+                    teams.setdefault(t_id, list()).append(self.free[w_id])
+
+                for j, t in enumerate(tasks):
+                    if t.id not in teams or evaluation.rewards[j] <= 0:
+                        continue
+                    team = teams[t.id]
+                    for w in team:
+                        del self.free[w.id]
+                    del self.pending[t.id]
+                    self._push(self.now + float(evaluation.finish_times[j]), RELEASE, (t, team))
+                    self.busy_workers += len(team)
+                    self.busy_tasks += 1
+                    assigned_tasks += 1
+                    assigned_workers += len(team)
+                    reward += float(evaluation.rewards[j])
+
+        stats = EpochStats(
+            epoch=self.epoch,
+            time=self.now,
+            duration=self.epoch_length,
+            pending_tasks=len(tasks),
+            free_workers=len(workers),
+            assigned_tasks=assigned_tasks,
+            assigned_workers=assigned_workers,
+            reward=reward,
+            arrived_tasks=self.arrived,
+            completed_tasks=self.completed,
+            expired_tasks=self.expired,
+            solver_time=solver_time,
+        )
+        self.epoch += 1
+        self.arrived, self.completed, self.expired = 0, 0, 0
+        return stats
+
+    def _remaining(self, arrival: float, t: Task) -> Task:
+        """
+        the task as seen at the current time, deadline and expected time shortened by the waiting time.
+        """
+        waited = self.now - arrival
+        if waited == 0:
+            return t
+        return dataclasses.replace(
+            t, deadline=t.deadline - waited, expected_time=t.expected_time - waited
+        )
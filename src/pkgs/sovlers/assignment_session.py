@@ -0,0 +1,194 @@
+import time
+from typing import Tuple, List, Dict, Set, Iterable, Optional
+
+import numpy as np
+
+from src.pkgs.sovlers.base_solver import BaseSolver
+from src.pkgs.sovlers.mip_solver import MIPSolver
+from src.pkgs.structs.evaluator import SolutionEvaluator
+from src.pkgs.structs.reward_model import RewardModel, LinearPenaltyReward
+from src.pkgs.structs.task import Task
+from src.pkgs.structs.worker import Worker
+
+
+class AssignmentSession:
+    """
+    stateful assignment over a changing pool of workers and tasks.
+
+    1. add/remove workers and tasks between dispatch rounds.
+    2. only the eligibility of the changed entities is recomputed, with the solvers' distance engine.
+    3. tasks affected by a change are marked dirty.
+    4. solve() re-optimizes the dirty tasks with the workers not used by
+       untouched tasks, warm started from the previous assignment.
+       untouched tasks keep their teams.
+    """
+
+    def __init__(
+        self,
+        workers: Iterable[Worker] = (),
+        tasks: Iterable[Task] = (),
+        gap_rel: float = 0.1,
+        reward_model: Optional[RewardModel] = None,
+    ):
+        """
+        @param workers: initial workers.
+        @param tasks: initial tasks.
+        @param gap_rel: relative mip gap used for every re-solve.
+        @param reward_model: reward of the tasks, linear penalty if None.
+        """
+        self.gap_rel = gap_rel
+        self.reward_model = LinearPenaltyReward() if reward_model is None else reward_model
+
+        self.workers: Dict[int, Worker] = dict()
+        self.tasks: Dict[int, Task] = dict()
+
+        # eligibility, t_id -> {w_id: travel time} and w_id -> {t_id}
+        self.candidates: Dict[int, Dict[int, float]] = dict()
+        self.eligible_tasks: Dict[int, Set[int]] = dict()
+
+        # current solution
+        self.teams: Dict[int, Set[int]] = dict()
+        self.assigned: Dict[int, int] = dict()
+        self.rewards: Dict[int, float] = dict()
+        self.finish_times: Dict[int, float] = dict()
+
+        self.dirty: Set[int] = set()
+
+        for w in workers:
+            self.add_worker(w)
+        for t in tasks:
+            self.add_task(t)
+
+    def add_worker(self, w: Worker):
+        self.workers[w.id] = w
+        self.eligible_tasks[w.id] = set()
+        tasks = list(self.tasks.values())
+        distances = BaseSolver.distance.instance([w], tasks, cache=False)
+        for j in np.flatnonzero(distances.eligible[0]):
+            t = tasks[j]
+            _t = float(distances.travel[0, j])
+            self.candidates[t.id][w.id] = _t
+            self.eligible_tasks[w.id].add(t.id)
+            if self._may_improve(t, _t):
+                self.dirty.add(t.id)
+
+    def remove_worker(self, w_id: int):
+        w = self.workers.pop(w_id)
+        for t_id in self.eligible_tasks.pop(w.id):
+            del self.candidates[t_id][w.id]
+
+        # its team has to be re-formed
+        if w.id in self.assigned:
+            t_id = self.assigned.pop(w.id)
+            self.teams[t_id].discard(w.id)
+            self.dirty.add(t_id)
+
+    def add_task(self, t: Task):
+        self.tasks[t.id] = t
+        self.candidates[t.id] = dict()
+        self.teams[t.id] = set()
+        self.rewards[t.id] = 0.0
+        self.finish_times[t.id] = float("inf")
+        workers = list(self.workers.values())
+        distances = BaseSolver.distance.instance(workers, [t], cache=False)
+        for i in np.flatnonzero(distances.eligible[:, 0]):
+            self.candidates[t.id][workers[i].id] = float(distances.travel[i, 0])
+            self.eligible_tasks[workers[i].id].add(t.id)
+        self.dirty.add(t.id)
+
+    def remove_task(self, t_id: int):
+        t = self.tasks.pop(t_id)
+        for w_id in self.candidates.pop(t.id):
+            self.eligible_tasks[w_id].discard(t.id)
+        del self.rewards[t.id]
+        del self.finish_times[t.id]
+        self.dirty.discard(t.id)
+
+        # freed workers may improve other tasks
+        for w_id in self.teams.pop(t.id):
+            del self.assigned[w_id]
+            for _t_id in self.eligible_tasks[w_id]:
+                if self._may_improve(self.tasks[_t_id], self.candidates[_t_id][w_id]):
+                    self.dirty.add(_t_id)
+
+    def solve(self) -> Tuple[float, float, float, List[Tuple[int, int]]]:
+        """
+        re-solve the dirty part of the instance.
+        :return: total reward, solved tasks, computation time in seconds, (worker id, task id) assignments
+        """
+        start = time.time()
+
+        if len(self.dirty) > 0:
+            # release the teams of dirty tasks, they are used as the mip start
+            initial_assignments = list()
+            for t_id in self.dirty:
+                for w_id in self.teams[t_id]:
+                    del self.assigned[w_id]
+                    initial_assignments.append((w_id, t_id))
+                self.teams[t_id] = set()
+
+            # workers kept by untouched tasks are fixed
+            w_ids = set()
+            for t_id in self.dirty:
+                w_ids.update(
+                    w_id for w_id in self.candidates[t_id] if w_id not in self.assigned
+                )
+
+            sub_workers = [self.workers[x] for x in w_ids]
+            sub_tasks = [self.tasks[x] for x in self.dirty]
+            if len(sub_workers) > 0:
+                try:
+                    _reward, _, _, assignments = MIPSolver(
+                        sub_workers,
+                        sub_tasks,
+                        gap_rel=self.gap_rel,
+                        initial_assignments=initial_assignments,
+                        reward_model=self.reward_model,
+                    ).solve()
+                except Exception:
+                    self._assign(initial_assignments)
+                    raise
+                if _reward < 0:
+                    # previous teams are restored, dirty tasks stay dirty and are retried next round
+                    self._assign(initial_assignments)
+                    self._update_rewards(list(self.dirty))
+                    return -1, -1, time.time() - start, list()
+                self._assign(assignments)
+
+            self._update_rewards(list(self.dirty))
+            self.dirty = set()
+
+        reward = sum(self.rewards.values())
+        solved = sum(1 for x in self.rewards.values() if x > 0)
+        end = time.time()
+        return reward, solved, end - start, self.assignments()
+
+    def assignments(self) -> List[Tuple[int, int]]:
+        return [(w_id, t_id) for w_id, t_id in self.assigned.items()]
+
+    def _assign(self, assignments: List[Tuple[int, int]]):
+        for w_id, t_id in assignments:
+            self.teams[t_id].add(w_id)
+            self.assigned[w_id] = t_id
+
+    def _update_rewards(self, t_ids: List[int]):
+        """
+        reward and finish time of the teams of the given tasks, inf if a task has no team.
+        """
+        assignments = [(w_id, t_id) for t_id in t_ids for w_id in self.teams[t_id]]
+        evaluation = SolutionEvaluator(
+            [self.workers[x[0]] for x in assignments],
+            [self.tasks[x] for x in t_ids],
+            self.reward_model,
+            BaseSolver.distance,
+        ).evaluate(assignments)
+        for j, t_id in enumerate(t_ids):
+            self.rewards[t_id] = float(evaluation.rewards[j])
+            self.finish_times[t_id] = float(evaluation.finish_times[j])
+
+    def _may_improve(self, t: Task, _travel_time: float) -> bool:
+        """
+        adding a worker to a team lowers the finish time only if its travel time is
+        lower than the current finish time, and only matters if the reward is not maxed.
+        """
+        return self.rewards[t.id] < t.reward and _travel_time < self.finish_times[t.id]
@@ -0,0 +1,181 @@
+import time
+from typing import Tuple, List, Dict, Any, Optional
+
+import numpy as np
+
+from src.pkgs.sovlers.base_solver import BaseSolver
+from src.pkgs.structs.evaluator import SolutionEvaluator
+from src.pkgs.structs.reward_model import RewardModel
+from src.pkgs.structs.task import Task
+from src.pkgs.structs.worker import Worker
+
+
+class AuctionSolver(BaseSolver):
+    """
+    1. every task wants the team of its closest workers that maximizes reward minus the prices of the workers,
+       either taking workers from other tasks or skipping them.
+    2. tasks that can improve by more than eps bid for the workers of that team they don't hold yet,
+       raising the prices by eps plus their share of the surplus.
+    3. every worker goes to its highest bid, the tasks that lose a worker keep the rest of their team.
+    4. stop at an eps-equilibrium: no task can improve by more than eps.
+
+    eps is relative to the largest task reward, so it doesn't depend on the scale of the rewards.
+
+    all bids of a round are computed at once on the task x worker matrices.
+    """
+
+    def __init__(
+        self,
+        workers: List[Worker],
+        tasks: List[Task],
+        eps: float = 0.01,
+        max_rounds: int = 1000,
+        reward_model: Optional[RewardModel] = None,
+    ):
+        """
+        @param workers:
+        @param tasks:
+        @param eps: min bid increment and min improvement worth a bid, as a fraction of the largest task reward,
+                    in (0, 1), larger is faster and less accurate.
+        @param max_rounds: bidding rounds before giving up on the equilibrium.
+        @param reward_model: reward of the tasks, linear penalty if None.
+        """
+        super().__init__(workers, tasks, reward_model)
+        if not 0 < eps < 1:
+            raise ValueError("eps must be in (0, 1), it is a fraction of the largest task reward")
+        self.eps = eps
+        self.max_rounds = max_rounds
+
+    def params(self) -> Dict[str, Any]:
+        return {"eps": self.eps, "max_rounds": self.max_rounds}
+
+    def _solve(self) -> Tuple[float, float, float, List[Tuple[int, int]]]:
+        start = time.time()
+        assignments = self.auction()
+        evaluation = self.evaluate(assignments)
+        end = time.time()
+        return evaluation.reward, evaluation.solved, end - start, assignments
+
+    def auction(self) -> List[Tuple[int, int]]:
+        n_workers, n_tasks = len(self.workers), len(self.tasks)
+        if n_workers == 0 or n_tasks == 0:
+            return list()
+        ev = SolutionEvaluator(self.workers, self.tasks, self.reward_model, self.distance)
+        model = self.reward_model
+        eps = self.eps * float(ev.t_reward.max())
+        if eps <= 0:
+            # no task earns anything
+            return list()
+
+        with self.profiler.timer("reward_curves"):
+            # travel time and eligibility, tasks x workers
+            distances = self.distance.instance(self.workers, self.tasks)
+            travel = distances.travel.T.astype(np.float64)
+            eligible = distances.eligible.T
+
+            # the best team is a prefix of the workers sorted by travel time,
+            # so the reward of every prefix, net of pair costs, is computed once
+            costs = np.zeros((n_tasks, n_workers))
+            if model.has_pair_costs:
+                costs = np.where(eligible, model.pair_costs(travel, ev.w_ids[None, :]), 0.0)
+            travel = np.where(eligible, travel, np.inf)
+            order = np.argsort(travel, axis=1)
+            sorted_travel = np.take_along_axis(travel, order, axis=1)
+            sorted_costs = np.take_along_axis(costs, order, axis=1)
+            finish_time = (
+                np.cumsum(sorted_travel, axis=1) + ev.t_workload[:, None]
+            ) / np.arange(1, n_workers + 1)[None, :]
+            curves = model.curve(
+                finish_time,
+                ev.t_deadline[:, None],
+                ev.t_expected_time[:, None],
+                ev.t_penalty_rate[:, None],
+                ev.t_reward[:, None],
+            ) - np.cumsum(sorted_costs, axis=1)
+
+        task_idx = np.arange(n_tasks)
+        worker_idx = np.arange(n_workers)
+        price = np.zeros(n_workers)
+        owner = np.full(n_workers, -1)
+
+        with self.profiler.timer("bidding"):
+            for _ in range(self.max_rounds):
+                self.profiler.count("rounds")
+
+                # value of the teams held now
+                held = owner >= 0
+                current = ev.evaluate_indices(np.nonzero(held)[0], owner[held]).rewards
+
+                # a task pays nothing for its own workers
+                sorted_owner = owner[order]
+                own = sorted_owner == task_idx[:, None]
+                cost = np.where(own, 0.0, price[order])
+
+                # best team among the closest workers, taking them from other tasks if needed
+                net = curves - np.cumsum(cost, axis=1)
+                best_k = np.argmax(net, axis=1)
+                best = net[task_idx, best_k]
+                in_team = worker_idx[None, :] <= best_k[:, None]
+
+                # best team among the closest workers not held by other tasks
+                free = own | (sorted_owner < 0)
+                cnt = np.cumsum(free, axis=1)
+                free_finish_time = np.where(
+                    free,
+                    (np.cumsum(np.where(free, sorted_travel, 0.0), axis=1) + ev.t_workload[:, None])
+                    / np.maximum(cnt, 1),
+                    np.inf,
+                )
+                free_net = model.curve(
+                    free_finish_time,
+                    ev.t_deadline[:, None],
+                    ev.t_expected_time[:, None],
+                    ev.t_penalty_rate[:, None],
+                    ev.t_reward[:, None],
+                ) - np.cumsum(np.where(free, cost + sorted_costs, 0.0), axis=1)
+                free_net = np.where(free, free_net, -np.inf)
+                free_k = np.argmax(free_net, axis=1)
+                free_best = free_net[task_idx, free_k]
+
+                use_free = free_best > best
+                best = np.where(use_free, free_best, best)
+                in_team = np.where(
+                    use_free[:, None], free & (worker_idx[None, :] <= free_k[:, None]), in_team
+                )
+
+                surplus = best - current
+                bidding = surplus > eps
+                if not bidding.any():
+                    break
+
+                # bidding tasks release the workers outside of their best team
+                release = own & ~in_team & bidding[:, None]
+                owner[order[release]] = -1
+
+                # bid for the rest of the team, the surplus is shared by the new workers
+                want = in_team & ~own & bidding[:, None]
+                increment = eps + surplus / np.maximum(want.sum(axis=1), 1)
+                bids = np.full((n_tasks, n_workers), -np.inf)
+                np.put_along_axis(
+                    bids,
+                    order,
+                    np.where(want, price[order] + increment[:, None], -np.inf),
+                    axis=1,
+                )
+
+                # every worker goes to its highest bid
+                winner = np.argmax(bids, axis=0)
+                top = bids[winner, worker_idx]
+                won = top > -np.inf
+                owner[won] = winner[won]
+                price[won] = top[won]
+
+        # drop the teams that earn nothing
+        held = owner >= 0
+        rewards = ev.evaluate_indices(np.nonzero(held)[0], owner[held]).rewards
+        owner[held & (rewards[np.maximum(owner, 0)] <= 0)] = -1
+
+        return [
+            (self.workers[i].id, self.tasks[owner[i]].id)
+            for i in np.nonzero(owner >= 0)[0]
+        ]
@@ -1,10 +1,95 @@
-from abc import ABC
-from typing import Tuple
+from abc import ABC, abstractmethod
+from typing import Tuple, List, Optional, Dict, Any
+
+from src.pkgs.profiling.profiler import Profiler
+from src.pkgs.sovlers.solution_cache import SolutionCache
+from src.pkgs.structs.distance import DistanceEngine
+from src.pkgs.structs.evaluator import SolutionEvaluator, Evaluation
+from src.pkgs.structs.reward_model import RewardModel, LinearPenaltyReward
+from src.pkgs.structs.task import Task
+from src.pkgs.structs.worker import Worker
 
 
 class BaseSolver(ABC):
-    def solve(self) -> Tuple[float, float, float]:
+    # shared by all solvers, set it to enable result caching
+    cache: Optional[SolutionCache] = None
+    # shared by all solvers, replace it with an enabled one to collect timings
+    profiler: Profiler = Profiler()
+    # shared by all solvers, replace it to change the distance metric, keeps the travel times of recent instances
+    distance: DistanceEngine = DistanceEngine()
+
+    def __init__(
+        self,
+        workers: List[Worker],
+        tasks: List[Task],
+        reward_model: Optional[RewardModel] = None,
+    ):
         """
-        :return: total reward, perfect solved, partial solved, computation time in seconds
+        @param workers:
+        @param tasks:
+        @param reward_model: reward of the tasks, linear penalty if None.
+        """
+        self.workers = workers
+        self.tasks = tasks
+        self.reward_model = LinearPenaltyReward() if reward_model is None else reward_model
+        # whether the last result came from the cache
+        self.cached = False
+
+    def solve(self) -> Tuple[float, float, float, List[Tuple[int, int]]]:
         """
+        results are served from the cache if the same instance has been solved before with the same code,
+        in that case cached is set and the computation time is the one of the original solve.
+        :return: total reward, solved tasks, computation time in seconds, (worker id, task id) assignments
+        """
+        with self.profiler.scope(type(self).__name__):
+            self.profiler.count("workers", len(self.workers))
+            self.profiler.count("tasks", len(self.tasks))
+            self.cached = False
+
+            if self.cache is None:
+                with self.profiler.timer("solve"):
+                    return self._solve()
+
+            key = SolutionCache.fingerprint(
+                self.workers,
+                self.tasks,
+                type(self).__name__,
+                dict(
+                    self.params(),
+                    reward_model=self.reward_model.params(),
+                    distance=self.distance.params(),
+                ),
+            )
+            ret = self.cache.get(key)
+            if ret is None:
+                self.profiler.count("cache_miss")
+                with self.profiler.timer("solve"):
+                    ret = self._solve()
+                # failed solves are not cached
+                if ret[0] >= 0:
+                    self.cache.put(key, ret)
+            else:
+                self.profiler.count("cache_hit")
+                self.cached = True
+            return ret
+
+    @abstractmethod
+    def _solve(self) -> Tuple[float, float, float, List[Tuple[int, int]]]:
         pass
+
+    def params(self) -> Dict[str, Any]:
+        """
+        :return: solver parameters that affect the result, part of the cache key
+        """
+        return {}
+
+    def evaluate(self, assignments: List[Tuple[int, int]]) -> Evaluation:
+        """
+        shared by all solvers, so the rewards of different solvers are comparable.
+        :param assignments: (worker id, task id) assignments
+        :return:
+        """
+        with self.profiler.timer("evaluate"):
+            return SolutionEvaluator(
+                self.workers, self.tasks, self.reward_model, self.distance
+            ).evaluate(assignments)
@@ -1,32 +1,47 @@
 import time
-from typing import Tuple, List, Iterable
+from typing import Tuple, List, Iterable, Dict, Any, Optional
 from src.pkgs.sovlers.base_solver import BaseSolver
 from src.pkgs.sovlers.mip_solver import MIPSolver
+from src.pkgs.structs.reward_model import RewardModel
 from src.pkgs.structs.task import Task
 from src.pkgs.structs.worker import Worker
 
 
 class BatchMIPSolver(BaseSolver):
-    def __init__(self, n: int, workers: List[Worker], tasks: List[Task]):
+    def __init__(
+        self,
+        n: int,
+        workers: List[Worker],
+        tasks: List[Task],
+        reward_model: Optional[RewardModel] = None,
+    ):
         """
         @param n: solver splits the map to n * n squares for batching.
         @param workers:
         @param tasks:
+        @param reward_model: reward of the tasks, linear penalty if None.
         """
+        super().__init__(workers, tasks, reward_model)
         self.n = n
-        self.workers = workers
-        self.tasks = tasks
 
-    def solve(self) -> Tuple[float, float, float]:
-        reward, solved = 0.0, 0.0
+    def params(self) -> Dict[str, Any]:
+        return {"n": self.n}
+
+    def _solve(self) -> Tuple[float, float, float, List[Tuple[int, int]]]:
+        assignments = list()
         start = time.time()
-        for w, t in self.batching():
+        with self.profiler.timer("batching"):
+            cells = list(self.batching())
+        for w, t in cells:
             if len(w) > 0 and len(t) > 0:
-                _reward, _solved, _, _ = MIPSolver(w, t).solve()
-                reward += _reward
-                solved += _solved
+                _reward, _, _, _assignments = MIPSolver(w, t, reward_model=self.reward_model).solve()
+                # failed cells contribute nothing
+                if _reward < 0:
+                    continue
+                assignments += _assignments
+        evaluation = self.evaluate(assignments)
         end = time.time()
-        return reward, solved, end - start
+        return evaluation.reward, evaluation.solved, end - start, assignments
 
     def batching(self) -> Iterable[Tuple[List[Worker], List[Task]]]:
         """
@@ -1,56 +1,138 @@
 import random
 import time
-from typing import Tuple, List, Iterable
+from typing import Tuple, List, Iterable, Dict, Any, Optional
+
+import numpy as np
+
 from src.pkgs.sovlers.base_solver import BaseSolver
 from src.pkgs.sovlers.mip_solver import MIPSolver
+from src.pkgs.structs.reward_model import RewardModel
 from src.pkgs.structs.task import Task
 from src.pkgs.structs.worker import Worker
 
 
 class BatchWithBacklogMIPSolver(BaseSolver):
-    def __init__(self, n: int, backlog_size: int, workers: List[Worker], tasks: List[Task]):
+    """
+    1. cells are solved in serpentine order, so consecutive cells are neighbours.
+    2. workers and tasks left over by a cell are carried to the next one, only if they
+       can be matched there, against the tasks and workers of the next cell and the other left overs:
+       workers eligible to one of these tasks, tasks one of these workers is eligible to.
+       left overs are carried through cells without workers or without tasks.
+    3. at most backlog_size of each are carried, ranked by remaining value:
+       the best reward a worker can reach in the next cell, the reward of a task.
+    4. ties are broken by a generator seeded with seed, runs with the same seed are identical.
+    """
+
+    def __init__(
+        self,
+        n: int,
+        backlog_size: int,
+        workers: List[Worker],
+        tasks: List[Task],
+        seed: int = 0,
+        reward_model: Optional[RewardModel] = None,
+    ):
         """
         @param n: solver splits the map to n * n squares for batching.
-        @param backlog_size: backlog size
+        @param backlog_size: max workers and max tasks carried to the next cell.
         @param workers:
         @param tasks:
+        @param seed: seed of the tie-breaking between carried workers and tasks.
+        @param reward_model: reward of the tasks, linear penalty if None.
         """
+        super().__init__(workers, tasks, reward_model)
         self.n = n
         self.backlog_size = backlog_size
-        self.workers = workers
-        self.tasks = tasks
+        self.seed = seed
+
+    def params(self) -> Dict[str, Any]:
+        return {"n": self.n, "backlog_size": self.backlog_size, "seed": self.seed}
 
-    def solve(self) -> Tuple[float, float, float]:
-        reward, solved = 0.0, 0.0
+    def _solve(self) -> Tuple[float, float, float, List[Tuple[int, int]]]:
+        assignments = list()
         start = time.time()
+        rng = random.Random(self.seed)
         backlog_w = list()
         backlog_t = list()
-        for w, t in self.batching():
+        with self.profiler.timer("batching"):
+            cells = list(self.batching())
+        for k, (cell_w, cell_t) in enumerate(cells):
+            w = cell_w + backlog_w
+            t = cell_t + backlog_t
+
+            _assignments = list()
             if len(w) > 0 and len(t) > 0:
-                w += backlog_w
-                t += backlog_t
-
-                _reward, _solved, _, assignments = MIPSolver(w, t).solve()
-                reward += _reward
-                solved += _solved
-
-                # update backlog
-                w_id_set = set()
-                t_id_set = set()
-                for w_id, t_id in assignments:
-                    w_id_set.add(w_id)
-                    t_id_set.add(t_id)
-                backlog_w = list(filter(lambda x: x.id not in w_id_set, w))
-                backlog_t = list(filter(lambda x: x.id not in t_id_set, t))
-                backlog_w = random.sample(backlog_w, k=min(self.backlog_size, len(backlog_w)))
-                backlog_t = random.sample(backlog_t, k=min(self.backlog_size, len(backlog_t)))
+                _reward, _, _, _assignments = MIPSolver(w, t, reward_model=self.reward_model).solve()
+                # failed cells contribute nothing, everything is left over
+                if _reward < 0:
+                    _assignments = list()
+                assignments += _assignments
+
+            if k + 1 == len(cells):
+                break
 
+            # update backlog
+            w_id_set = set()
+            t_id_set = set()
+            for w_id, t_id in _assignments:
+                w_id_set.add(w_id)
+                t_id_set.add(t_id)
+            left_w = [x for x in w if x.id not in w_id_set]
+            left_t = [x for x in t if x.id not in t_id_set]
+            with self.profiler.timer("backlog"):
+                backlog_w, backlog_t = self.carry(left_w, left_t, *cells[k + 1], rng)
+            self.profiler.count("carried_workers", len(backlog_w))
+            self.profiler.count("carried_tasks", len(backlog_t))
+
+        evaluation = self.evaluate(assignments)
         end = time.time()
-        return reward, solved, end - start
+        return evaluation.reward, evaluation.solved, end - start, assignments
+
+    def carry(
+        self,
+        left_w: List[Worker],
+        left_t: List[Task],
+        next_w: List[Worker],
+        next_t: List[Task],
+        rng: random.Random,
+    ) -> Tuple[List[Worker], List[Task]]:
+        """
+        @param left_w: workers left over by the current cell.
+        @param left_t: tasks left over by the current cell.
+        @param next_w: workers of the next cell.
+        @param next_t: tasks of the next cell.
+        @param rng: tie-breaking generator.
+        :return: workers and tasks carried to the next cell, by decreasing remaining value
+        """
+        # the next cell is solved with its own workers and tasks plus the carried ones
+        pool_t = next_t + left_t
+        pool_w = next_w + left_w
+
+        # best reward a left over worker can reach in the next cell
+        w_value = dict()
+        if len(left_w) > 0 and len(pool_t) > 0:
+            eligible = self.distance.instance(left_w, pool_t, cache=False).eligible
+            rewards = np.where(eligible, np.array([t.reward for t in pool_t])[None, :], -np.inf)
+            for i in np.flatnonzero(eligible.any(axis=1)):
+                w_value[left_w[i].id] = float(rewards[i].max())
+        backlog_w = [x for x in left_w if x.id in w_value]
+
+        backlog_t = list()
+        if len(left_t) > 0 and len(pool_w) > 0:
+            eligible = self.distance.instance(pool_w, left_t, cache=False).eligible
+            backlog_t = [left_t[j] for j in np.flatnonzero(eligible.any(axis=0))]
+
+        # shuffle then stable sort, equal values are ordered by the generator only
+        rng.shuffle(backlog_w)
+        rng.shuffle(backlog_t)
+        backlog_w.sort(key=lambda x: w_value[x.id], reverse=True)
+        backlog_t.sort(key=lambda x: x.reward, reverse=True)
+        return backlog_w[:self.backlog_size], backlog_t[:self.backlog_size]
 
     def batching(self) -> Iterable[Tuple[List[Worker], List[Task]]]:
         """
-        random batch
+        n * n cells in serpentine order, every cell is adjacent to the previous one.
+        entities on the upper bounds belong to the last row / column.
         """
         min_lat = min([x.lat for x in self.workers] + [x.lat for x in self.tasks])
         min_lon = min([x.lon for x in self.workers] + [x.lon for x in self.tasks])
@@ -60,10 +142,18 @@ class BatchWithBacklogMIPSolver(BaseSolver):
         lat_delta = (max_lat - min_lat) / self.n
         lon_delta = (max_lon - min_lon) / self.n
 
+        def cell(x) -> Tuple[int, int]:
+            i = int((x.lat - min_lat) / lat_delta) if lat_delta > 0 else 0
+            j = int((x.lon - min_lon) / lon_delta) if lon_delta > 0 else 0
+            return min(i, self.n - 1), min(j, self.n - 1)
+
+        w_cells: Dict[Tuple[int, int], List[Worker]] = dict()
+        t_cells: Dict[Tuple[int, int], List[Task]] = dict()
+        for x in self.workers:
+            w_cells.setdefault(cell(x), list()).append(x)
+        for x in self.tasks:
+            t_cells.setdefault(cell(x), list()).append(x)
+
         for i in range(self.n):
-            for j in range(self.n):
-                w = list(filter(lambda x: (min_lat + i * lat_delta <= x.lat < min_lat + (i + 1) * lat_delta) and (
-                            min_lon + j * lon_delta <= x.lon < min_lon + (j + 1) * lon_delta), self.workers))
-                t = list(filter(lambda x: (min_lat + i * lat_delta <= x.lat < min_lat + (i + 1) * lat_delta) and (
-                        min_lon + j * lon_delta <= x.lon < min_lon + (j + 1) * lon_delta), self.tasks))
-                yield w, t
+            for j in range(self.n) if i % 2 == 0 else reversed(range(self.n)):
+                yield list(w_cells.get((i, j), ())), list(t_cells.get((i, j), ()))
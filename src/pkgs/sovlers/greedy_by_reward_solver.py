@@ -2,9 +2,7 @@ import time
 from typing import List, Tuple
 
 from src.pkgs.sovlers.base_solver import BaseSolver
-from src.pkgs.structs.task import Task
-from src.pkgs.structs.utils import get_sorted_available_workers, get_finish_time
-from src.pkgs.structs.worker import Worker
+from src.pkgs.structs.team_formation import TeamFormation
 
 
 class GreedyByRewardSolver(BaseSolver):
@@ -15,59 +13,40 @@ class GreedyByRewardSolver(BaseSolver):
     4. try finish as more tasks as possible.
     """
 
-    def __init__(self, workers: List[Worker], tasks: List[Task]):
-        self.workers = workers
-        self.tasks = tasks
-
-    def greedy_solve(self) -> Tuple[float, float]:
+    def sort_tasks(self):
         # desc sort tasks by reward
         self.tasks.sort(key=lambda x: x.reward, reverse=True)
 
-        # solve
-        workers_set = set(self.workers)
-        assigned_workers = set()
-        reward = 0.0
-        solved = 0
-        for t in self.tasks:
-            best_reward = 0.0
-            best_workers = list()
+    def greedy_solve(self) -> List[Tuple[int, int]]:
+        self.sort_tasks()
 
-            # get available_workers
-            available_workers = get_sorted_available_workers(
-                workers_set - assigned_workers, t
+        # sorted eligible workers of every task
+        with self.profiler.timer("eligibility"):
+            team_formation = TeamFormation(
+                self.workers, self.tasks, self.reward_model, self.distance
             )
 
-            # no available workers
-            if len(available_workers) == 0:
-                continue
-
-            # select workers from close to far
-            for i in range(1, len(available_workers)):
-                finish_time = get_finish_time(available_workers[:i], t)
-
-                if finish_time >= t.deadline:
-                    _r = 0.0
-                elif finish_time <= t.expected_time:
-                    _r = t.reward
-                else:
-                    _r = t.reward - t.penalty_rate * (finish_time - t.expected_time)
-
-                if _r > best_reward:
-                    best_reward = _r
-                    best_workers = available_workers[:i]
+        # solve
+        assignments = list()
+        for t in self.tasks:
+            # best prefix of the available workers, from close to far
+            with self.profiler.timer("team_selection"):
+                reward, team = team_formation.best_team(t.id)
 
-            # update reward and assigned_workers
-            reward += best_reward
-            for w in best_workers:
-                assigned_workers.add(w)
+            # no contribution
+            if reward <= 0:
+                continue
 
-            if reward > 0:
-                solved += 1
+            # update assigned workers
+            for w in team:
+                team_formation.remove_worker(w.id)
+                assignments.append((w.id, t.id))
 
-        return reward, solved
+        return assignments
 
-    def solve(self) -> Tuple[float, float, float]:
+    def _solve(self) -> Tuple[float, float, float, List[Tuple[int, int]]]:
         start = time.time()
-        reward, solved = self.greedy_solve()
+        assignments = self.greedy_solve()
+        evaluation = self.evaluate(assignments)
         end = time.time()
-        return reward, solved, end - start
+        return evaluation.reward, evaluation.solved, end - start, assignments
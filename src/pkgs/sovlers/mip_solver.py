@@ -1,5 +1,9 @@
+import os
+import subprocess
 import time
-from typing import Tuple, List, Set
+from typing import Tuple, List, Set, Dict, Any, Optional
+
+import numpy as np
 from pulp import (
     LpProblem,
     LpMaximize,
@@ -11,19 +15,102 @@ from pulp import (
     value,
     LpStatus,
     CPLEX_CMD,
+    PulpSolverError,
+    constants,
 )
+from src.pkgs.profiling.profiler import Profiler
 from src.pkgs.sovlers.base_solver import BaseSolver
+from src.pkgs.structs.reward_model import RewardModel, Row
 from src.pkgs.structs.task import Task
-from src.pkgs.structs.utils import travel_time, is_worker_available
 from src.pkgs.structs.worker import Worker
 
 
+class ProfiledCPLEX_CMD(CPLEX_CMD):
+    """
+    CPLEX_CMD timing its phases apart: lp writing, the cplex run and the solution reading.
+    """
+
+    def __init__(self, profiler: Profiler, **kwargs):
+        super().__init__(**kwargs)
+        self.profiler = profiler
+
+    def actualSolve(self, lp):
+        """
+        CPLEX_CMD.actualSolve with a timer per phase.
+        """
+        if not self.executable(self.path):
+            raise PulpSolverError("PuLP: cannot execute " + self.path)
+        tmp_lp, tmp_sol, tmp_mst = self.create_tmp_files(lp.name, "lp", "sol", "mst")
+        try:
+            with self.profiler.timer("write_lp"):
+                vs = lp.writeLP(tmp_lp, writeSOS=1)
+                cmds = f"read {tmp_lp}\n"
+                if self.optionsDict.get("warmStart", False):
+                    self.writesol(filename=tmp_mst, vs=vs)
+                    cmds += f"read {tmp_mst}\nset advance 1\n"
+            if self.timeLimit is not None:
+                cmds += f"set timelimit {self.timeLimit}\n"
+            for option in self.options + self.getOptions():
+                cmds += option + "\n"
+            if lp.isMIP():
+                cmds += "mipopt\nchange problem fixed\n" if self.mip else "change problem lp\n"
+            cmds += f"optimize\nwrite {tmp_sol}\nquit\n"
+
+            with self.profiler.timer("solver"):
+                ret = subprocess.run(
+                    [self.path],
+                    input=cmds.encode("UTF-8"),
+                    capture_output=not self.msg,
+                )
+                if ret.returncode != 0:
+                    raise PulpSolverError("PuLP: Error while trying to execute " + self.path)
+
+            with self.profiler.timer("read_solution"):
+                if not os.path.exists(tmp_sol):
+                    status = constants.LpStatusInfeasible
+                    values = reduced_costs = shadow_prices = slacks = sol_status = None
+                else:
+                    status, values, reduced_costs, shadow_prices, slacks, sol_status = self.readsol(tmp_sol)
+                if status != constants.LpStatusInfeasible:
+                    lp.assignVarsVals(values)
+                    lp.assignVarsDj(reduced_costs)
+                    lp.assignConsPi(shadow_prices)
+                    lp.assignConsSlack(slacks)
+                lp.assignStatus(status, sol_status)
+        finally:
+            self.delete_tmp_files(tmp_lp, tmp_mst, tmp_sol)
+            if self.optionsDict.get("logPath") != "cplex.log":
+                self.delete_tmp_files("cplex.log")
+        return status
+
+
 class MIPSolver(BaseSolver):
-    def __init__(self, workers: List[Worker], tasks: List[Task]):
-        self.workers = workers
-        self.tasks = tasks
+    def __init__(
+        self,
+        workers: List[Worker],
+        tasks: List[Task],
+        gap_rel: float = 0.1,
+        initial_assignments: Optional[List[Tuple[int, int]]] = None,
+        reward_model: Optional[RewardModel] = None,
+    ):
+        """
+        @param workers:
+        @param tasks:
+        @param gap_rel: relative mip gap cplex stops at.
+        @param initial_assignments: (worker id, task id) assignments used as the mip start.
+        @param reward_model: reward of the tasks, linear penalty if None.
+        """
+        super().__init__(workers, tasks, reward_model)
+        self.gap_rel = gap_rel
+        self.initial_assignments = initial_assignments
 
-    def solve(self) -> Tuple[float, float, float, List[Tuple[int, int]]]:
+    def params(self) -> Dict[str, Any]:
+        ret = {"gap_rel": self.gap_rel}
+        if self.initial_assignments is not None:
+            ret["initial_assignments"] = sorted(self.initial_assignments)
+        return ret
+
+    def _solve(self) -> Tuple[float, float, float, List[Tuple[int, int]]]:
         start = time.time()
         reward, solved, assignments = self._mip_solve()
         end = time.time()
@@ -62,7 +149,7 @@ class MIPSolver(BaseSolver):
 
 
 
-        maximize sum(r_i)
+        maximize sum(r_i) - sum(A_ij * c_ij), c_ij: cost of the pair in the reward model, 0 by default.
         s.t.:
             sum(A_ij) <= 1, for i in workers. Each worker can only be assigned to one task.
 
@@ -86,7 +173,8 @@ class MIPSolver(BaseSolver):
             =====> linearize =====>
             sum(h_ij) == sum(A_ij * t_ij) + s_j.wl
 
-            # if-else constraints
+            # if-else constraints, for the linear penalty reward model.
+            # other models bring their own constraints, see RewardModel.linearize.
             if s_i.t_e < s_i.d:
                 r_i = s_i.maxR - (s_i.t_e - s_i.e) * s_i.pr
             else:
@@ -108,148 +196,166 @@ class MIPSolver(BaseSolver):
         # constants
         M = 10e3
 
-        # compute travel time
-        t = [[0] * len(self.tasks) for _ in range(len(self.workers))]
-        reverse_t = [[0] * len(self.workers) for _ in range(len(self.tasks))]
-        for i in range(len(self.workers)):
-            for j in range(len(self.tasks)):
-                _ = travel_time(
-                    self.workers[i].lat,
-                    self.workers[i].lon,
-                    self.tasks[j].lat,
-                    self.tasks[j].lon,
-                    self.workers[i].velocity,
-                )
-                t[i][j] = _
-                reverse_t[j][i] = _
-
-        # create a problem
-        prob = LpProblem("my_problem", LpMaximize)
-
-        # create variables
-        r = list()
-        for i in range(len(self.tasks)):
-            r.append(
-                LpVariable(
-                    f"r_{i}",
-                    lowBound=0.0,
-                    upBound=self.tasks[i].reward,
-                    cat=LpContinuous,
-                )
-            )
+        # compute travel time and eligibility
+        with self.profiler.timer("travel_time"):
+            distances = self.distance.instance(self.workers, self.tasks)
+            reverse_t = distances.travel.T.tolist()
+            eligible = distances.eligible.tolist()
 
-        a = [[0] * len(self.tasks) for _ in range(len(self.workers))]
-        reverse_a = [[0] * len(self.workers) for _ in range(len(self.tasks))]
-        for i in range(len(self.workers)):
-            for j in range(len(self.tasks)):
-                _ = LpVariable(f"A_{i}_{j}", cat=LpBinary)
-                a[i][j] = _
-                reverse_a[j][i] = _
-
-        t_e = list()
-        for i in range(len(self.tasks)):
-            t_e.append(
-                LpVariable(
-                    f"t_e_{i}",
-                    lowBound=0.0,
-                    upBound=self.tasks[i].deadline + 1.0,
-                    cat=LpContinuous,
-                )
-            )
+        with self.profiler.timer("build"):
+            # create a problem
+            prob = LpProblem("my_problem", LpMaximize)
 
-        delta = list()
-        beta = list()
-        for i in range(len(self.tasks)):
-            delta.append(LpVariable(f"delta_{i}", cat=LpBinary))
-            beta.append(LpVariable(f"beta_{i}", cat=LpBinary))
-
-        h = [[0] * len(self.tasks) for _ in range(len(self.workers))]
-        reverse_h = [[0] * len(self.workers) for _ in range(len(self.tasks))]
-        for i in range(len(self.workers)):
-            for j in range(len(self.tasks)):
-                _ = LpVariable(
-                    f"h_{i}_{j}",
-                    lowBound=0.0,
-                    upBound=self.tasks[j].deadline,
-                    cat=LpContinuous,
+            # create variables
+            r = list()
+            for i in range(len(self.tasks)):
+                r.append(
+                    LpVariable(
+                        f"r_{i}",
+                        lowBound=0.0,
+                        upBound=self.tasks[i].reward,
+                        cat=LpContinuous,
+                    )
                 )
-                h[i][j] = _
-                reverse_h[j][i] = _
-
-        # add constraints
-        for i in range(len(self.workers)):
-            for j in range(len(self.tasks)):
-                if not is_worker_available(self.workers[i], self.tasks[j]):
-                    prob += a[i][j] == 0
-
-                prob += h[i][j] <= 0.001 + a[i][j] * M
-                prob += h[i][j] >= -0.001 - a[i][j] * M
-                prob += h[i][j] <= t_e[j] + (1 - a[i][j]) * M
-                prob += h[i][j] >= t_e[j] - (1 - a[i][j]) * M
-
-            prob += lpSum(a[i]) <= 1
-
-        for i in range(len(self.tasks)):
-            task = self.tasks[i]
-            # beta = 1 if lpSum(reverse_a[i]) = 1
-            # beta = 0 if lpSum(reverse_a[i]) = 0
-            prob += lpSum(reverse_a[i]) >= 1 - M * (1 - beta[i])
-            prob += lpSum(reverse_a[i]) <= 0 + M * beta[i]
-
-            # if beta = 0, sum(h) = 0 => t_e >= deadline
-            # if beta = 1, sum(h) = sum(a * t) + wl >= t_e = h
-            prob += lpSum(reverse_h[i]) >= lpDot(
-                reverse_a[i], reverse_t[i]
-            ) + task.workload - M * (1 - beta[i])
-            prob += lpSum(reverse_h[i]) <= lpDot(
-                reverse_a[i], reverse_t[i]
-            ) + task.workload + M * (1 - beta[i])
-            prob += lpSum(reverse_h[i]) >= -0.001 - M * beta[i]
-            prob += lpSum(reverse_h[i]) <= 0.001 + M * beta[i]
-
-            # if beta = 0, t_e >= deadline
-            prob += t_e[i] >= task.deadline + 1.0 - M * beta[i]
-            prob += t_e[i] <= task.deadline + 1.0 + M * beta[i]
-
-            # prob += t_e[i] <= task.deadline - epsilon + M * delta[i]
-            prob += t_e[i] >= task.deadline - M * (1 - delta[i])
-            prob += t_e[i] <= task.deadline + M * delta[i]
-
-            prob += (
-                    r[i]
-                    <= task.reward
-                    - (t_e[i] - task.expected_time) * task.penalty_rate
-                    + M * delta[i]
-            )
-            prob += (
-                    r[i]
-                    >= task.reward
-                    - (t_e[i] - task.expected_time) * task.penalty_rate
-                    - M * delta[i]
-            )
-            prob += r[i] <= M * (1 - delta[i])
-            prob += r[i] >= -M * (1 - delta[i])
-
-        # add objective
-        prob += lpSum(r)
 
-        # solve
-        status = prob.solve(CPLEX_CMD(msg=False, gapRel=0.1))
+            a = [[0] * len(self.tasks) for _ in range(len(self.workers))]
+            reverse_a = [[0] * len(self.workers) for _ in range(len(self.tasks))]
+            for i in range(len(self.workers)):
+                for j in range(len(self.tasks)):
+                    _ = LpVariable(f"A_{i}_{j}", cat=LpBinary)
+                    a[i][j] = _
+                    reverse_a[j][i] = _
+
+            # warm start from a previous assignment
+            if self.initial_assignments is not None:
+                initial = set(self.initial_assignments)
+                for i in range(len(self.workers)):
+                    for j in range(len(self.tasks)):
+                        a[i][j].setInitialValue(
+                            1 if (self.workers[i].id, self.tasks[j].id) in initial else 0
+                        )
+
+            t_e = list()
+            for i in range(len(self.tasks)):
+                t_e.append(
+                    LpVariable(
+                        f"t_e_{i}",
+                        lowBound=0.0,
+                        upBound=self.tasks[i].deadline + 1.0,
+                        cat=LpContinuous,
+                    )
+                )
 
-        if LpStatus[status] == "Optimal":
-            reward = 0.0
-            solved = 0
+            beta = list()
             for i in range(len(self.tasks)):
-                if value(r[i]) > 0.01:
-                    reward += value(r[i])
-                    solved += 1
+                beta.append(LpVariable(f"beta_{i}", cat=LpBinary))
 
-            assignments = list()
+            h = [[0] * len(self.tasks) for _ in range(len(self.workers))]
+            reverse_h = [[0] * len(self.workers) for _ in range(len(self.tasks))]
             for i in range(len(self.workers)):
                 for j in range(len(self.tasks)):
-                    if value(a[i][j]) == 1.0:
-                        assignments.append((self.workers[i].id, self.tasks[j].id))
+                    _ = LpVariable(
+                        f"h_{i}_{j}",
+                        lowBound=0.0,
+                        upBound=self.tasks[j].deadline,
+                        cat=LpContinuous,
+                    )
+                    h[i][j] = _
+                    reverse_h[j][i] = _
+
+            # add constraints
+            for i in range(len(self.workers)):
+                for j in range(len(self.tasks)):
+                    if not eligible[i][j]:
+                        prob += a[i][j] == 0
+
+                    prob += h[i][j] <= 0.001 + a[i][j] * M
+                    prob += h[i][j] >= -0.001 - a[i][j] * M
+                    prob += h[i][j] <= t_e[j] + (1 - a[i][j]) * M
+                    prob += h[i][j] >= t_e[j] - (1 - a[i][j]) * M
+
+                prob += lpSum(a[i]) <= 1
+
+            for i in range(len(self.tasks)):
+                task = self.tasks[i]
+                # beta = 1 if lpSum(reverse_a[i]) = 1
+                # beta = 0 if lpSum(reverse_a[i]) = 0
+                prob += lpSum(reverse_a[i]) >= 1 - M * (1 - beta[i])
+                prob += lpSum(reverse_a[i]) <= 0 + M * beta[i]
+
+                # if beta = 0, sum(h) = 0 => t_e >= deadline
+                # if beta = 1, sum(h) = sum(a * t) + wl >= t_e = h
+                prob += lpSum(reverse_h[i]) >= lpDot(
+                    reverse_a[i], reverse_t[i]
+                ) + task.workload - M * (1 - beta[i])
+                prob += lpSum(reverse_h[i]) <= lpDot(
+                    reverse_a[i], reverse_t[i]
+                ) + task.workload + M * (1 - beta[i])
+                prob += lpSum(reverse_h[i]) >= -0.001 - M * beta[i]
+                prob += lpSum(reverse_h[i]) <= 0.001 + M * beta[i]
+
+                # if beta = 0, t_e >= deadline
+                prob += t_e[i] >= task.deadline + 1.0 - M * beta[i]
+                prob += t_e[i] <= task.deadline + 1.0 + M * beta[i]
+
+                # reward, the linear penalty one is the if-else constraints above
+                linearization = self.reward_model.linearize(task, M)
+                variables = {"e": t_e[i], "r": r[i]}
+                for name in linearization.binaries:
+                    variables[name] = LpVariable(f"{name}_{i}", cat=LpBinary)
+                self._add_rows(prob, linearization.rows, variables)
+
+            # add objective
+            if self.reward_model.has_pair_costs:
+                w_ids = np.array([w.id for w in self.workers], dtype=np.int64)
+                costs = self.reward_model.pair_costs(
+                    distances.travel.astype(np.float64), w_ids[:, None]
+                )
+                prob += lpSum(r) - lpSum(
+                    costs[i, j] * a[i][j]
+                    for i in range(len(self.workers))
+                    for j in range(len(self.tasks))
+                    if eligible[i][j]
+                )
+            else:
+                prob += lpSum(r)
+
+        self.profiler.count("variables", prob.numVariables())
+        self.profiler.count("constraints", prob.numConstraints())
+
+        # solve, timed by phase
+        status = prob.solve(
+            ProfiledCPLEX_CMD(
+                self.profiler,
+                msg=False,
+                gapRel=self.gap_rel,
+                warmStart=self.initial_assignments is not None,
+            )
+        )
 
-            return reward, solved, assignments
+        if LpStatus[status] == "Optimal":
+            with self.profiler.timer("extract"):
+                assignments = list()
+                for i in range(len(self.workers)):
+                    for j in range(len(self.tasks)):
+                        if value(a[i][j]) > 0.5:
+                            assignments.append((self.workers[i].id, self.tasks[j].id))
+
+            evaluation = self.evaluate(assignments)
+            return evaluation.reward, evaluation.solved, assignments
         else:
             return -1, -1, list()
+
+    @staticmethod
+    def _add_rows(prob: LpProblem, rows: List[Row], variables: Dict[str, LpVariable]):
+        """
+        add the rows of a linearization, with its variable names mapped to the problem's variables.
+        """
+        for terms, sense, rhs in rows:
+            expr = lpSum(c * variables[name] for c, name in terms)
+            if sense == "<=":
+                prob += expr <= rhs
+            elif sense == ">=":
+                prob += expr >= rhs
+            else:
+                prob += expr == rhs
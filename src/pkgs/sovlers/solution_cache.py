@@ -0,0 +1,129 @@
+import dataclasses
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import threading
+from typing import Tuple, List, Optional, Dict, Any
+
+from src.pkgs.structs.task import Task
+from src.pkgs.structs.worker import Worker
+
+PKGS_PATH = pathlib.Path(__file__).parents[1]
+
+
+@functools.lru_cache(maxsize=None)
+def code_version() -> str:
+    """
+    :return: hash of the sources under src/pkgs, any code change invalidates the cached results
+    """
+    h = hashlib.sha256()
+    for file_path in sorted(PKGS_PATH.rglob("*.py")):
+        h.update(file_path.relative_to(PKGS_PATH).as_posix().encode())
+        h.update(file_path.read_bytes())
+    return h.hexdigest()
+
+
+class SolutionCache:
+    """
+    content-addressed on-disk cache of solver results.
+
+    a result is keyed by a hash of the worker/task data, the solver name,
+    the solver parameters and the solver code, so unchanged inputs are never solved twice.
+    """
+
+    def __init__(self, path: str, max_size: int = 256 * 1024 * 1024):
+        """
+        @param path: directory the cached results are stored in.
+        @param max_size: max total size of the cache in bytes, least recently used results are evicted first.
+        """
+        self.path = path
+        self.max_size = max_size
+        # guards size and eviction, solvers may run in threads
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        self.size = sum(
+            e.stat().st_size for e in os.scandir(self.path) if e.name.endswith(".json")
+        )
+
+    @staticmethod
+    def fingerprint(
+        workers: List[Worker], tasks: List[Task], solver: str, params: Dict[str, Any]
+    ) -> str:
+        h = hashlib.sha256()
+        h.update(
+            json.dumps(
+                {"solver": solver, "params": params, "code": code_version()}, sort_keys=True
+            ).encode()
+        )
+        for w in workers:
+            h.update(repr(dataclasses.astuple(w)).encode())
+        h.update(b"|")
+        for t in tasks:
+            h.update(repr(dataclasses.astuple(t)).encode())
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[float, float, float, List[Tuple[int, int]]]]:
+        file_path = os.path.join(self.path, f"{key}.json")
+        try:
+            with open(file_path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        # refresh access time for lru eviction, unless it was evicted meanwhile
+        try:
+            os.utime(file_path)
+        except FileNotFoundError:
+            pass
+        return (
+            data["reward"],
+            data["solved"],
+            data["time"],
+            [tuple(x) for x in data["assignments"]],
+        )
+
+    def put(self, key: str, result: Tuple[float, float, float, List[Tuple[int, int]]]):
+        reward, solved, t, assignments = result
+        file_path = os.path.join(self.path, f"{key}.json")
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "reward": reward,
+                    "solved": solved,
+                    "time": t,
+                    "assignments": [list(x) for x in assignments],
+                },
+                f,
+            )
+
+        with self._lock:
+            if os.path.exists(file_path):
+                self.size -= os.path.getsize(file_path)
+            os.replace(tmp_path, file_path)
+            self.size += os.path.getsize(file_path)
+            self.evict()
+
+    def evict(self):
+        """
+        remove least recently used results until the cache fits in max_size, called under the lock.
+        """
+        if self.size <= self.max_size:
+            return
+
+        entries = [e for e in os.scandir(self.path) if e.name.endswith(".json")]
+        entries.sort(key=lambda x: x.stat().st_mtime)
+        for e in entries:
+            if self.size <= self.max_size:
+                break
+            self.size -= e.stat().st_size
+            os.remove(e.path)
+
+    def clear(self):
+        with self._lock:
+            for e in os.scandir(self.path):
+                if e.name.endswith(".json"):
+                    os.remove(e.path)
+            self.size = 0
@@ -0,0 +1,258 @@
+import itertools
+import os
+import subprocess
+import xml.etree.ElementTree as et
+from typing import Tuple, List, Optional, TextIO, Iterable, Iterator
+
+import numpy as np
+from pulp import CPLEX_CMD, PulpSolverError
+
+from src.pkgs.sovlers.mip_solver import MIPSolver
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+# cplex solution status values with a feasible solution
+FEASIBLE_STATUS = {"1", "101", "102", "104", "105", "107", "109", "111", "113"}
+
+
+class StreamingMIPSolver(MIPSolver):
+    """
+    same model as MIPSolver, for large instances.
+
+    1. only eligible (worker, task) pairs get A/h variables, the others are fixed to 0 anyway.
+    2. the model is written straight to a cplex lp file in row order, no pulp expressions are built.
+    3. variables are named by index: a{k}/h{k} for the k-th pair, r{j}/f{j}/b{j} for the j-th task,
+       y{j}_{name} for the binaries of the reward model.
+       no name starts with e, cplex reads e{digits} as an exponent.
+    4. pairs are kept as numpy index arrays, no dense or transposed W x T copies,
+       eligibility is computed by blocks of workers.
+    5. the solution file is parsed incrementally, keeping only the assigned pairs.
+    """
+
+    # max terms per line, cplex limits the lp line length
+    TERMS_PER_LINE = 8
+
+    def _mip_solve(self) -> Tuple[float, float, List[Tuple[int, int]]]:
+        # constants
+        M = 10e3
+
+        solver = CPLEX_CMD(msg=False, gapRel=self.gap_rel)
+        if not solver.executable(solver.path):
+            raise PulpSolverError("PuLP: cannot execute " + solver.path)
+        tmp_lp, tmp_sol, tmp_mst = solver.create_tmp_files("streaming_mip", "lp", "sol", "mst")
+
+        try:
+            with self.profiler.timer("eligibility"):
+                w_idx, t_idx, travel = self._eligible_pairs()
+
+            with self.profiler.timer("build"):
+                with open(tmp_lp, "w") as f:
+                    n_rows, n_variables = self._write_lp(f, w_idx, t_idx, travel, M)
+                if self.initial_assignments is not None:
+                    self._write_mst(tmp_mst, w_idx, t_idx)
+
+            self.profiler.count("variables", n_variables)
+            self.profiler.count("constraints", n_rows)
+            self.profiler.count("lp_bytes", os.path.getsize(tmp_lp))
+
+            # solve
+            with self.profiler.timer("solver"):
+                cmds = f"read {tmp_lp}\n"
+                if self.initial_assignments is not None:
+                    cmds += f"read {tmp_mst}\nset advance 1\n"
+                for option in solver.options + solver.getOptions():
+                    cmds += option + "\n"
+                cmds += f"mipopt\nwrite {tmp_sol}\nquit\n"
+                with subprocess.Popen(
+                    [solver.path],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                ) as proc:
+                    proc.stdin.write(cmds.encode("UTF-8"))
+                    proc.stdin.close()
+                    if hasattr(os, "wait4"):
+                        # resource usage of this cplex run only, ru_maxrss is in kilobytes on linux
+                        _, status, usage = os.wait4(proc.pid, 0)
+                        proc.returncode = os.waitstatus_to_exitcode(status)
+                        self.profiler.gauge("cplex_max_rss", usage.ru_maxrss * 1024)
+                    else:
+                        proc.wait()
+                if proc.returncode != 0:
+                    raise PulpSolverError("PuLP: Error while trying to execute " + solver.path)
+
+            with self.profiler.timer("extract"):
+                pairs = self._read_sol(tmp_sol)
+        finally:
+            solver.delete_tmp_files(tmp_lp, tmp_sol, tmp_mst)
+
+        if resource is not None:
+            # peak of the whole process so far, not of this solve, see --trace-memory for the latter
+            self.profiler.gauge(
+                "process_max_rss", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+            )
+
+        if pairs is None:
+            return -1, -1, list()
+
+        assignments = [(self.workers[w_idx[k]].id, self.tasks[t_idx[k]].id) for k in pairs]
+        evaluation = self.evaluate(assignments)
+        return evaluation.reward, evaluation.solved, assignments
+
+    def _eligible_pairs(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        one block of workers at a time, the blocks are not cached.
+        :return: worker positions, task positions and travel times of the eligible pairs, in row order
+        """
+        w_idx, t_idx, travel = list(), list(), list()
+        block_size = self.distance.block_size
+        for s in range(0, len(self.workers), block_size):
+            distances = self.distance.instance(
+                self.workers[s:s + block_size], self.tasks, cache=False
+            )
+            rows, cols = np.nonzero(distances.eligible)
+            w_idx.append(rows.astype(np.int64) + s)
+            t_idx.append(cols.astype(np.int64))
+            travel.append(distances.travel[rows, cols].astype(np.float64))
+
+        if len(w_idx) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        return np.concatenate(w_idx), np.concatenate(t_idx), np.concatenate(travel)
+
+    def _write_row(
+        self, f: TextIO, rows: Iterator[int], terms: Iterable[Tuple[float, str]], sense: str, rhs: float
+    ):
+        """
+        write one constraint, terms are (coefficient, variable name), rows numbers the constraints.
+        """
+        f.write(f" c{next(rows)}:")
+        for n, (c, name) in enumerate(terms):
+            if n > 0 and n % self.TERMS_PER_LINE == 0:
+                f.write("\n")
+            f.write(f" {'-' if c < 0 else '+'} {abs(c)!r} {name}")
+        f.write(f" {sense} {rhs!r}\n")
+
+    def _write_lp(
+        self, f: TextIO, w_idx: np.ndarray, t_idx: np.ndarray, travel: np.ndarray, M: float
+    ) -> Tuple[int, int]:
+        """
+        the constraints of MIPSolver._mip_solve, with the variables moved to the left side.
+        :return: number of constraints, number of variables
+        """
+        rows = itertools.count()
+        n_tasks = len(self.tasks)
+        # binary names of the reward model per task, its rows are written as they are built
+        binaries: List[Tuple[str, ...]] = list()
+
+        # add objective, minus the pair costs of the reward model
+        objective = [(1.0, f"r{j}") for j in range(n_tasks)]
+        if self.reward_model.has_pair_costs:
+            w_ids = np.array([w.id for w in self.workers], dtype=np.int64)
+            costs = self.reward_model.pair_costs(travel, w_ids[w_idx])
+            objective += [(-float(costs[k]), f"a{k}") for k in np.flatnonzero(costs)]
+        f.write("Maximize\n obj:")
+        for n, (c, name) in enumerate(objective):
+            if n > 0 and n % self.TERMS_PER_LINE == 0:
+                f.write("\n")
+            f.write(f" {'-' if c < 0 else '+'} {abs(c)!r} {name}")
+        f.write("\nSubject To\n")
+
+        # worker rows, pairs are in worker order
+        starts = np.searchsorted(w_idx, np.arange(len(self.workers) + 1))
+        for i in range(len(self.workers)):
+            ks = range(starts[i], starts[i + 1])
+            for k in ks:
+                j = t_idx[k]
+                self._write_row(f, rows, [(1.0, f"h{k}"), (-M, f"a{k}")], "<=", 0.001)
+                self._write_row(f, rows, [(1.0, f"h{k}"), (M, f"a{k}")], ">=", -0.001)
+                self._write_row(f, rows, [(1.0, f"h{k}"), (-1.0, f"f{j}"), (M, f"a{k}")], "<=", M)
+                self._write_row(f, rows, [(1.0, f"h{k}"), (-1.0, f"f{j}"), (-M, f"a{k}")], ">=", -M)
+            if len(ks) > 0:
+                self._write_row(f, rows, [(1.0, f"a{k}") for k in ks], "<=", 1.0)
+
+        # task rows, pairs grouped by task
+        by_task = np.argsort(t_idx, kind="stable")
+        starts = np.searchsorted(t_idx[by_task], np.arange(n_tasks + 1))
+        for j in range(n_tasks):
+            task = self.tasks[j]
+            ks = by_task[starts[j]:starts[j + 1]]
+            a = [(1.0, f"a{k}") for k in ks]
+            h = [(1.0, f"h{k}") for k in ks]
+            at = [(-float(travel[k]), f"a{k}") for k in ks]
+
+            # beta = 1 if sum(a) >= 1, beta = 0 if sum(a) = 0
+            self._write_row(f, rows, a + [(-M, f"b{j}")], ">=", 1 - M)
+            self._write_row(f, rows, a + [(-M, f"b{j}")], "<=", 0.0)
+
+            # if beta = 1, sum(h) = sum(a * t) + wl, if beta = 0, sum(h) = 0
+            self._write_row(f, rows, h + at + [(-M, f"b{j}")], ">=", task.workload - M)
+            self._write_row(f, rows, h + at + [(M, f"b{j}")], "<=", task.workload + M)
+            self._write_row(f, rows, h + [(M, f"b{j}")], ">=", -0.001)
+            self._write_row(f, rows, h + [(-M, f"b{j}")], "<=", 0.001)
+
+            # if beta = 0, t_e >= deadline
+            self._write_row(f, rows, [(1.0, f"f{j}"), (M, f"b{j}")], ">=", task.deadline + 1.0)
+            self._write_row(f, rows, [(1.0, f"f{j}"), (-M, f"b{j}")], "<=", task.deadline + 1.0)
+
+            # reward, see RewardModel.linearize
+            linearization = self.reward_model.linearize(task, M)
+            binaries.append(linearization.binaries)
+            names = {"e": f"f{j}", "r": f"r{j}"}
+            names.update((x, f"y{j}_{x}") for x in linearization.binaries)
+            for terms, sense, rhs in linearization.rows:
+                self._write_row(f, rows, [(c, names[x]) for c, x in terms], sense, rhs)
+
+        f.write("Bounds\n")
+        for j in range(n_tasks):
+            f.write(f" 0 <= r{j} <= {self.tasks[j].reward!r}\n")
+            f.write(f" 0 <= f{j} <= {self.tasks[j].deadline + 1.0!r}\n")
+        for k in range(len(t_idx)):
+            f.write(f" 0 <= h{k} <= {self.tasks[t_idx[k]].deadline!r}\n")
+
+        f.write("Binaries\n")
+        for k in range(len(t_idx)):
+            f.write(f" a{k}\n")
+        for j in range(n_tasks):
+            f.write(f" b{j}\n")
+            for x in binaries[j]:
+                f.write(f" y{j}_{x}\n")
+        f.write("End\n")
+
+        # next row number is the number of rows written
+        return next(rows), 2 * len(t_idx) + 3 * n_tasks + sum(len(x) for x in binaries)
+
+    def _write_mst(self, path: str, w_idx: np.ndarray, t_idx: np.ndarray):
+        """
+        cplex mip start with the initial assignments.
+        """
+        initial = set(self.initial_assignments)
+        root = et.Element("CPLEXSolution", version="1.2")
+        et.SubElement(root, "header")
+        variables = et.SubElement(root, "variables")
+        for k in range(len(w_idx)):
+            v = 1 if (self.workers[w_idx[k]].id, self.tasks[t_idx[k]].id) in initial else 0
+            et.SubElement(variables, "variable", name=f"a{k}", index=str(k), value=str(v))
+        et.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+    @staticmethod
+    def _read_sol(path: str) -> Optional[List[int]]:
+        """
+        :return: the assigned pairs, None if no feasible solution was found
+        """
+        if not os.path.exists(path):
+            return None
+
+        pairs = list()
+        for _, elem in et.iterparse(path):
+            if elem.tag == "header":
+                if elem.get("solutionStatusValue") not in FEASIBLE_STATUS:
+                    return None
+            elif elem.tag == "variable":
+                name = elem.get("name")
+                if name.startswith("a") and float(elem.get("value")) > 0.5:
+                    pairs.append(int(name[1:]))
+            elem.clear()
+        return pairs
@@ -0,0 +1,302 @@
+import hashlib
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Union, Dict, Any, Tuple, Optional
+
+import numpy as np
+
+from src.pkgs.structs.task import Task
+from src.pkgs.structs.worker import Worker
+
+# mean earth radius in km
+EARTH_RADIUS = 6371.0088
+
+Array = Union[float, np.ndarray]
+
+
+class DistanceMetric(ABC):
+    """
+    distance between points given by latitude / longitude in degrees,
+    vectorized: the arguments broadcast like numpy ufuncs.
+
+    velocities of the workers must be in the unit of the metric.
+    """
+
+    @abstractmethod
+    def distance(self, lat_1: Array, lon_1: Array, lat_2: Array, lon_2: Array) -> np.ndarray:
+        pass
+
+    def scalar_distance(self, lat_1: float, lon_1: float, lat_2: float, lon_2: float) -> float:
+        """
+        distance between two points, override it with plain math where numpy scalars are too slow.
+        """
+        return float(self.distance(lat_1, lon_1, lat_2, lon_2))
+
+    @abstractmethod
+    def params(self) -> Dict[str, Any]:
+        """
+        :return: metric parameters, part of the solvers' cache key
+        """
+        pass
+
+
+class EuclideanMetric(DistanceMetric):
+    """
+    euclidean distance on the raw degrees, the original approximation.
+    """
+
+    def distance(self, lat_1, lon_1, lat_2, lon_2) -> np.ndarray:
+        return np.sqrt(np.subtract(lat_1, lat_2) ** 2 + np.subtract(lon_1, lon_2) ** 2)
+
+    def scalar_distance(self, lat_1, lon_1, lat_2, lon_2) -> float:
+        return math.sqrt((lat_1 - lat_2) ** 2 + (lon_1 - lon_2) ** 2)
+
+    def params(self) -> Dict[str, Any]:
+        return {"metric": "euclidean"}
+
+
+class EquirectangularMetric(DistanceMetric):
+    """
+    euclidean distance after projecting the longitudes at the mean latitude of the two points,
+    close to haversine on city scale distances and cheaper.
+    """
+
+    def __init__(self, radius: float = EARTH_RADIUS):
+        """
+        @param radius: earth radius in the unit of the distance, math.degrees(1) gives degrees.
+        """
+        self.radius = radius
+
+    def distance(self, lat_1, lon_1, lat_2, lon_2) -> np.ndarray:
+        x = np.radians(np.subtract(lon_2, lon_1)) * np.cos(np.radians(np.add(lat_1, lat_2) / 2))
+        y = np.radians(np.subtract(lat_2, lat_1))
+        return self.radius * np.sqrt(x ** 2 + y ** 2)
+
+    def scalar_distance(self, lat_1, lon_1, lat_2, lon_2) -> float:
+        x = math.radians(lon_2 - lon_1) * math.cos(math.radians((lat_1 + lat_2) / 2))
+        y = math.radians(lat_2 - lat_1)
+        return self.radius * math.sqrt(x ** 2 + y ** 2)
+
+    def params(self) -> Dict[str, Any]:
+        return {"metric": "equirectangular", "radius": self.radius}
+
+
+class HaversineMetric(DistanceMetric):
+    """
+    great circle distance.
+    """
+
+    def __init__(self, radius: float = EARTH_RADIUS):
+        """
+        @param radius: earth radius in the unit of the distance, math.degrees(1) gives degrees.
+        """
+        self.radius = radius
+
+    def distance(self, lat_1, lon_1, lat_2, lon_2) -> np.ndarray:
+        phi_1 = np.radians(lat_1)
+        phi_2 = np.radians(lat_2)
+        a = (
+            np.sin((phi_2 - phi_1) / 2) ** 2
+            + np.cos(phi_1) * np.cos(phi_2) * np.sin(np.radians(np.subtract(lon_2, lon_1)) / 2) ** 2
+        )
+        return 2 * self.radius * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def scalar_distance(self, lat_1, lon_1, lat_2, lon_2) -> float:
+        phi_1 = math.radians(lat_1)
+        phi_2 = math.radians(lat_2)
+        a = (
+            math.sin((phi_2 - phi_1) / 2) ** 2
+            + math.cos(phi_1) * math.cos(phi_2) * math.sin(math.radians(lon_2 - lon_1) / 2) ** 2
+        )
+        return 2 * self.radius * math.asin(math.sqrt(min(a, 1.0)))
+
+    def params(self) -> Dict[str, Any]:
+        return {"metric": "haversine", "radius": self.radius}
+
+
+class LookupTableMetric(DistanceMetric):
+    """
+    precomputed distances between the nodes of a road network,
+    points are snapped to their closest node (euclidean on the degrees).
+    """
+
+    # points snapped at once, bounds the points x nodes temporaries
+    SNAP_BLOCK = 4096
+
+    def __init__(self, node_lat: np.ndarray, node_lon: np.ndarray, table: np.ndarray):
+        """
+        @param node_lat: latitude of the nodes.
+        @param node_lon: longitude of the nodes.
+        @param table: nodes x nodes distances, inf if unreachable.
+        """
+        self.node_lat = np.asarray(node_lat, dtype=np.float64)
+        self.node_lon = np.asarray(node_lon, dtype=np.float64)
+        self.table = np.asarray(table)
+        n = len(self.node_lat)
+        if len(self.node_lon) != n or self.table.shape != (n, n) or n == 0:
+            raise ValueError("table must be nodes x nodes, with one latitude and longitude per node")
+
+        h = hashlib.sha256()
+        for x in (self.node_lat, self.node_lon, self.table):
+            h.update(np.ascontiguousarray(x).tobytes())
+        self.digest = h.hexdigest()
+
+    def snap(self, lat: Array, lon: Array) -> np.ndarray:
+        """
+        :return: closest node of every point, with the shape of the broadcast arguments
+        """
+        lat, lon = np.broadcast_arrays(np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+        flat_lat, flat_lon = lat.ravel(), lon.ravel()
+        ret = np.empty(len(flat_lat), dtype=np.int64)
+        for s in range(0, len(flat_lat), self.SNAP_BLOCK):
+            e = s + self.SNAP_BLOCK
+            ret[s:e] = np.argmin(
+                (flat_lat[s:e, None] - self.node_lat[None, :]) ** 2
+                + (flat_lon[s:e, None] - self.node_lon[None, :]) ** 2,
+                axis=1,
+            )
+        return ret.reshape(lat.shape)
+
+    def distance(self, lat_1, lon_1, lat_2, lon_2) -> np.ndarray:
+        # snapping each side on its own keeps block queries at O((W + T) * nodes)
+        return self.table[self.snap(lat_1, lon_1), self.snap(lat_2, lon_2)].astype(np.float64)
+
+    def params(self) -> Dict[str, Any]:
+        return {"metric": "lookup_table", "digest": self.digest}
+
+
+@dataclass(frozen=True)
+class InstanceDistances:
+    # workers x tasks travel times, float32 if precision allows
+    travel: np.ndarray
+    # workers x tasks eligibility, see utils.is_worker_available
+    eligible: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return self.travel.nbytes + self.eligible.nbytes
+
+
+class DistanceEngine:
+    """
+    travel times and eligibility of whole worker x task blocks.
+
+    1. blocks are computed block_size workers at a time, in float64.
+    2. travel times are stored as float32 while the rounding error stays under atol, float64 otherwise.
+       eligibility is decided before rounding.
+    3. results are cached per instance, least recently used instances are evicted past max_bytes.
+       cached arrays are read only.
+    4. thread safe, the cache is updated under a lock and blocks are computed outside of it.
+    """
+
+    def __init__(
+        self,
+        metric: Optional[DistanceMetric] = None,
+        block_size: int = 1024,
+        atol: float = 1e-6,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        @param metric: euclidean on the degrees if None.
+        @param block_size: workers per block, bounds the float64 temporaries.
+        @param atol: max absolute error of the float32 travel times.
+        @param max_bytes: max total size of the cached instances.
+        """
+        self.metric = EuclideanMetric() if metric is None else metric
+        self.block_size = block_size
+        self.atol = atol
+        self.max_bytes = max_bytes
+        self._cache: "OrderedDict[Tuple, InstanceDistances]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def params(self) -> Dict[str, Any]:
+        return self.metric.params()
+
+    def pair_travel_times(
+        self,
+        w_lat: np.ndarray,
+        w_lon: np.ndarray,
+        t_lat: np.ndarray,
+        t_lon: np.ndarray,
+        velocity: np.ndarray,
+    ) -> np.ndarray:
+        """
+        travel times of aligned (worker, task) pairs, float64.
+        """
+        return self.metric.distance(w_lat, w_lon, t_lat, t_lon) / velocity
+
+    def instance(
+        self, workers: List[Worker], tasks: List[Task], cache: bool = True
+    ) -> InstanceDistances:
+        """
+        @param workers:
+        @param tasks:
+        @param cache: False for one-off blocks, e.g. a single new worker.
+        :return: travel times and eligibility, workers x tasks
+        """
+        key = (tuple(workers), tuple(tasks))
+        if cache:
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return self._cache[key]
+
+        ret = self._compute(workers, tasks)
+        if cache and ret.nbytes <= self.max_bytes:
+            with self._lock:
+                # another thread may have computed it meanwhile
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return self._cache[key]
+                self._cache[key] = ret
+                self._size += ret.nbytes
+                while self._size > self.max_bytes:
+                    _, x = self._cache.popitem(last=False)
+                    self._size -= x.nbytes
+        return ret
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._size = 0
+
+    def _compute(self, workers: List[Worker], tasks: List[Task]) -> InstanceDistances:
+        t_lat, t_lon, t_deadline = np.array(
+            [(t.lat, t.lon, t.deadline) for t in tasks], dtype=np.float64
+        ).reshape(-1, 3).T
+
+        travel = np.empty((len(workers), len(tasks)), dtype=np.float32)
+        eligible = np.empty((len(workers), len(tasks)), dtype=bool)
+        for s in range(0, len(workers), self.block_size):
+            block = workers[s:s + self.block_size]
+            w_lat, w_lon, velocity, min_lat, max_lat, min_lon, max_lon = np.array(
+                [(w.lat, w.lon, w.velocity, w.min_lat, w.max_lat, w.min_lon, w.max_lon) for w in block],
+                dtype=np.float64,
+            ).T[:, :, None]
+            _travel = self.metric.distance(w_lat, w_lon, t_lat[None, :], t_lon[None, :]) / velocity
+
+            eligible[s:s + len(block)] = (
+                (min_lat <= t_lat[None, :])
+                & (t_lat[None, :] <= max_lat)
+                & (min_lon <= t_lon[None, :])
+                & (t_lon[None, :] <= max_lon)
+                & (_travel <= t_deadline[None, :])
+            )
+
+            if travel.dtype == np.float32:
+                rounded = _travel.astype(np.float32)
+                with np.errstate(invalid="ignore"):
+                    # inf - inf is nan, exact anyway
+                    if np.any(np.abs(rounded - _travel) > self.atol):
+                        travel = travel.astype(np.float64)
+            travel[s:s + len(block)] = _travel
+
+        # shared through the cache
+        travel.setflags(write=False)
+        eligible.setflags(write=False)
+        return InstanceDistances(travel=travel, eligible=eligible)
+
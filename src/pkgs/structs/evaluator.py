@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+from typing import List, Tuple, Optional
+
+import numpy as np
+
+from src.pkgs.structs.distance import DistanceEngine
+from src.pkgs.structs.reward_model import RewardModel, LinearPenaltyReward
+from src.pkgs.structs.task import Task
+from src.pkgs.structs.worker import Worker
+
+
+@dataclass(frozen=True)
+class Evaluation:
+    reward: float
+    solved: int
+    # per task, in the order of the evaluator's tasks
+    rewards: np.ndarray
+    finish_times: np.ndarray
+    # workers assigned to more than one task
+    conflicts: np.ndarray
+    # (worker id, task id) pairs violating the eligibility
+    ineligible: np.ndarray
+
+    @property
+    def feasible(self) -> bool:
+        return len(self.conflicts) == 0 and len(self.ineligible) == 0
+
+
+class SolutionEvaluator:
+    """
+    computes finish time, reward and feasibility of a full assignment in one vectorized pass.
+    """
+
+    def __init__(
+        self,
+        workers: List[Worker],
+        tasks: List[Task],
+        reward_model: Optional[RewardModel] = None,
+        engine: Optional[DistanceEngine] = None,
+    ):
+        """
+        @param workers:
+        @param tasks:
+        @param reward_model: reward of the tasks, linear penalty if None.
+        @param engine: distance engine, euclidean on the degrees if None.
+        """
+        self.workers = workers
+        self.tasks = tasks
+        self.reward_model = LinearPenaltyReward() if reward_model is None else reward_model
+        self.engine = DistanceEngine() if engine is None else engine
+
+        self.w_index = {w.id: i for i, w in enumerate(workers)}
+        self.t_index = {t.id: i for i, t in enumerate(tasks)}
+        self.w_ids = np.array([w.id for w in workers], dtype=np.int64)
+        self.t_ids = np.array([t.id for t in tasks], dtype=np.int64)
+
+        self.w_lat = np.array([w.lat for w in workers], dtype=np.float64)
+        self.w_lon = np.array([w.lon for w in workers], dtype=np.float64)
+        self.w_min_lat = np.array([w.min_lat for w in workers], dtype=np.float64)
+        self.w_min_lon = np.array([w.min_lon for w in workers], dtype=np.float64)
+        self.w_max_lat = np.array([w.max_lat for w in workers], dtype=np.float64)
+        self.w_max_lon = np.array([w.max_lon for w in workers], dtype=np.float64)
+        self.w_velocity = np.array([w.velocity for w in workers], dtype=np.float64)
+
+        self.t_lat = np.array([t.lat for t in tasks], dtype=np.float64)
+        self.t_lon = np.array([t.lon for t in tasks], dtype=np.float64)
+        self.t_deadline = np.array([t.deadline for t in tasks], dtype=np.float64)
+        self.t_workload = np.array([t.workload for t in tasks], dtype=np.float64)
+        self.t_expected_time = np.array([t.expected_time for t in tasks], dtype=np.float64)
+        self.t_penalty_rate = np.array([t.penalty_rate for t in tasks], dtype=np.float64)
+        self.t_reward = np.array([t.reward for t in tasks], dtype=np.float64)
+
+    def evaluate(self, assignments: List[Tuple[int, int]]) -> Evaluation:
+        """
+        :param assignments: (worker id, task id) assignments
+        :return:
+        """
+        w_idx = np.fromiter(
+            (self.w_index[x[0]] for x in assignments), dtype=np.int64, count=len(assignments)
+        )
+        t_idx = np.fromiter(
+            (self.t_index[x[1]] for x in assignments), dtype=np.int64, count=len(assignments)
+        )
+        return self.evaluate_indices(w_idx, t_idx)
+
+    def evaluate_indices(self, w_idx: np.ndarray, t_idx: np.ndarray) -> Evaluation:
+        """
+        same as evaluate, but takes worker and task positions, useful in local search.
+        :param w_idx: worker positions
+        :param t_idx: task positions, aligned with w_idx
+        :return:
+        """
+        n_tasks = len(self.tasks)
+
+        travel = self.engine.pair_travel_times(
+            self.w_lat[w_idx],
+            self.w_lon[w_idx],
+            self.t_lat[t_idx],
+            self.t_lon[t_idx],
+            self.w_velocity[w_idx],
+        )
+
+        # finish_time * worker_num = total_travel_time + workload
+        total_travel = np.bincount(t_idx, weights=travel, minlength=n_tasks)
+        w_cnt = np.bincount(t_idx, minlength=n_tasks)
+        finish_times = np.full(n_tasks, np.inf)
+        np.divide(total_travel + self.t_workload, w_cnt, out=finish_times, where=w_cnt > 0)
+
+        rewards = self.reward_model.curve(
+            finish_times,
+            self.t_deadline,
+            self.t_expected_time,
+            self.t_penalty_rate,
+            self.t_reward,
+        )
+        if self.reward_model.has_pair_costs:
+            costs = self.reward_model.pair_costs(travel, self.w_ids[w_idx])
+            rewards = rewards - np.bincount(t_idx, weights=costs, minlength=n_tasks)
+
+        # disjoint workers
+        conflicts = self.w_ids[np.bincount(w_idx, minlength=len(self.workers)) > 1]
+
+        # eligibility
+        t_lat = self.t_lat[t_idx]
+        t_lon = self.t_lon[t_idx]
+        eligible = (
+            (self.w_min_lat[w_idx] <= t_lat)
+            & (t_lat <= self.w_max_lat[w_idx])
+            & (self.w_min_lon[w_idx] <= t_lon)
+            & (t_lon <= self.w_max_lon[w_idx])
+            & (travel <= self.t_deadline[t_idx])
+        )
+        ineligible = np.stack(
+            [self.w_ids[w_idx[~eligible]], self.t_ids[t_idx[~eligible]]], axis=1
+        )
+
+        return Evaluation(
+            reward=float(rewards.sum()),
+            solved=int(np.count_nonzero(rewards > 0)),
+            rewards=rewards,
+            finish_times=finish_times,
+            conflicts=conflicts,
+            ineligible=ineligible,
+        )
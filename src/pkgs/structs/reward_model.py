@@ -0,0 +1,246 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Tuple, Union, Dict, Any, Sequence, Mapping, Optional
+
+import numpy as np
+
+from src.pkgs.structs.task import Task
+
+# (terms, sense, rhs), terms are (coefficient, variable name), sense is "<=", ">=" or "="
+Row = Tuple[List[Tuple[float, str]], str, float]
+
+
+def get_rewards(
+    finish_time: Union[float, np.ndarray],
+    deadline: Union[float, np.ndarray],
+    expected_time: Union[float, np.ndarray],
+    penalty_rate: Union[float, np.ndarray],
+    reward: Union[float, np.ndarray],
+) -> np.ndarray:
+    """
+    vectorized reward of tasks given their finish times.
+    full reward before the expected time, linear penalty until the deadline, zero after.
+    """
+    return np.where(
+        finish_time >= deadline,
+        0.0,
+        np.where(
+            finish_time <= expected_time,
+            reward,
+            reward - penalty_rate * (finish_time - expected_time),
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class Linearization:
+    """
+    reward constraints of one task in a mip.
+
+    "e" is the finish time of the task, deadline + 1 if no worker is assigned,
+    "r" is its reward, bounded by [0, task.reward] and maximized.
+    """
+
+    # extra binary variables of the task, names without "_"
+    binaries: Tuple[str, ...]
+    rows: List[Row]
+
+
+class RewardModel(ABC):
+    """
+    reward of a task = curve(finish time of its team) - sum of the costs of its (worker, task) pairs.
+
+    1. curve() and pair_costs() are vectorized, they broadcast like numpy ufuncs.
+    2. linearize() gives the mip constraints of curve(), pair costs go to the mip objective.
+    3. curves must not increase with the finish time, so the fastest team of a given size is the best one.
+    """
+
+    @abstractmethod
+    def curve(
+        self,
+        finish_time: Union[float, np.ndarray],
+        deadline: Union[float, np.ndarray],
+        expected_time: Union[float, np.ndarray],
+        penalty_rate: Union[float, np.ndarray],
+        reward: Union[float, np.ndarray],
+    ) -> np.ndarray:
+        pass
+
+    @abstractmethod
+    def linearize(self, task: Task, M: float) -> Linearization:
+        pass
+
+    @property
+    def has_pair_costs(self) -> bool:
+        return False
+
+    def pair_costs(self, travel: np.ndarray, w_ids: np.ndarray) -> np.ndarray:
+        """
+        @param travel: travel times of the pairs.
+        @param w_ids: worker ids of the pairs, broadcast with travel.
+        :return: cost of every pair
+        """
+        return np.zeros(np.broadcast(travel, w_ids).shape)
+
+    @abstractmethod
+    def params(self) -> Dict[str, Any]:
+        """
+        :return: model parameters, part of the solvers' cache key
+        """
+        pass
+
+
+class LinearPenaltyReward(RewardModel):
+    """
+    full reward before the expected time, linear penalty until the deadline, zero after.
+    """
+
+    def curve(self, finish_time, deadline, expected_time, penalty_rate, reward) -> np.ndarray:
+        return get_rewards(finish_time, deadline, expected_time, penalty_rate, reward)
+
+    def linearize(self, task: Task, M: float) -> Linearization:
+        """
+        d = 1 if the task finishes after the deadline.
+        if d = 0, r = maxR - (t_e - e) * pr, if d = 1, r = 0.
+        """
+        rhs = task.reward + task.expected_time * task.penalty_rate
+        return Linearization(
+            binaries=("d",),
+            rows=[
+                ([(1.0, "e"), (-M, "d")], ">=", task.deadline - M),
+                ([(1.0, "e"), (-M, "d")], "<=", task.deadline),
+                ([(1.0, "r"), (task.penalty_rate, "e"), (-M, "d")], "<=", rhs),
+                ([(1.0, "r"), (task.penalty_rate, "e"), (M, "d")], ">=", rhs),
+                ([(1.0, "r"), (M, "d")], "<=", M),
+                ([(1.0, "r"), (-M, "d")], ">=", -M),
+            ],
+        )
+
+    def params(self) -> Dict[str, Any]:
+        return {"model": "linear_penalty"}
+
+
+class StepwiseSLAReward(RewardModel):
+    """
+    the reward drops by steps: a fraction of the full reward depending on the delay after the expected time,
+    zero past the last step or at the deadline.
+    """
+
+    def __init__(self, tiers: Sequence[Tuple[float, float]]):
+        """
+        @param tiers: (max delay after the expected time, fraction of the reward),
+                      by increasing delay and non increasing fraction.
+        """
+        delays = [float(x[0]) for x in tiers]
+        fractions = [float(x[1]) for x in tiers]
+        if len(tiers) == 0 or delays != sorted(delays) or fractions != sorted(fractions, reverse=True):
+            raise ValueError("tiers must be sorted by increasing delay and non increasing fraction")
+        self.delays = np.array(delays)
+        # past the last tier
+        self.fractions = np.array(fractions + [0.0])
+
+    def curve(self, finish_time, deadline, expected_time, penalty_rate, reward) -> np.ndarray:
+        tier = np.searchsorted(self.delays, np.subtract(finish_time, expected_time), side="left")
+        return np.where(finish_time >= deadline, 0.0, reward * self.fractions[tier])
+
+    def linearize(self, task: Task, M: float) -> Linearization:
+        """
+        z_k = 1 selects the k-th tier, only if t_e is within its delay.
+        r <= sum(z_k * fraction_k * maxR).
+        """
+        binaries = tuple(f"z{k}" for k in range(len(self.delays)))
+        rows = [([(1.0, z) for z in binaries], "<=", 1.0)]
+        for k, z in enumerate(binaries):
+            limit = min(task.expected_time + float(self.delays[k]), task.deadline)
+            rows.append(([(1.0, "e"), (M, z)], "<=", limit + M))
+        r = [(-task.reward * float(self.fractions[k]), z) for k, z in enumerate(binaries)]
+        rows.append(([(1.0, "r")] + r, "<=", 0.0))
+        return Linearization(binaries=binaries, rows=rows)
+
+    def params(self) -> Dict[str, Any]:
+        return {
+            "model": "stepwise_sla",
+            "tiers": [[float(d), float(f)] for d, f in zip(self.delays, self.fractions[:-1])],
+        }
+
+
+class PairCostReward(RewardModel):
+    """
+    curve of a base model minus a cost per (worker, task) pair, models are stacked by nesting them.
+    """
+
+    def __init__(self, base: Optional[RewardModel] = None):
+        """
+        @param base: model of the curve and of the other costs, linear penalty if None.
+        """
+        self.base = LinearPenaltyReward() if base is None else base
+
+    def curve(self, finish_time, deadline, expected_time, penalty_rate, reward) -> np.ndarray:
+        return self.base.curve(finish_time, deadline, expected_time, penalty_rate, reward)
+
+    def linearize(self, task: Task, M: float) -> Linearization:
+        return self.base.linearize(task, M)
+
+    @property
+    def has_pair_costs(self) -> bool:
+        return True
+
+    def pair_costs(self, travel: np.ndarray, w_ids: np.ndarray) -> np.ndarray:
+        return self.base.pair_costs(travel, w_ids) + self.own_costs(travel, w_ids)
+
+    @abstractmethod
+    def own_costs(self, travel: np.ndarray, w_ids: np.ndarray) -> np.ndarray:
+        pass
+
+
+class TravelCostReward(PairCostReward):
+    """
+    subtracts the travel time of every worker, times a rate.
+    """
+
+    def __init__(self, rate: float, base: Optional[RewardModel] = None):
+        """
+        @param rate: cost per unit of travel time.
+        @param base:
+        """
+        super().__init__(base)
+        self.rate = rate
+
+    def own_costs(self, travel: np.ndarray, w_ids: np.ndarray) -> np.ndarray:
+        shape = np.broadcast(travel, w_ids).shape
+        return np.broadcast_to(self.rate * np.asarray(travel, dtype=np.float64), shape)
+
+    def params(self) -> Dict[str, Any]:
+        return {"model": "travel_cost", "rate": self.rate, "base": self.base.params()}
+
+
+class WorkerCostReward(PairCostReward):
+    """
+    subtracts a fixed cost for every assigned worker.
+    """
+
+    def __init__(self, costs: Mapping[int, float], default: float = 0.0, base: Optional[RewardModel] = None):
+        """
+        @param costs: worker id -> cost.
+        @param default: cost of the workers not in costs.
+        @param base:
+        """
+        super().__init__(base)
+        self.default = default
+        self.w_ids = np.array(sorted(costs), dtype=np.int64)
+        self.costs = np.array([costs[x] for x in self.w_ids], dtype=np.float64)
+
+    def own_costs(self, travel: np.ndarray, w_ids: np.ndarray) -> np.ndarray:
+        w_ids = np.broadcast_to(w_ids, np.broadcast(travel, w_ids).shape)
+        if len(self.w_ids) == 0:
+            return np.full(w_ids.shape, self.default)
+        pos = np.minimum(np.searchsorted(self.w_ids, w_ids), len(self.w_ids) - 1)
+        return np.where(self.w_ids[pos] == w_ids, self.costs[pos], self.default)
+
+    def params(self) -> Dict[str, Any]:
+        return {
+            "model": "worker_cost",
+            "costs": [[int(w), float(c)] for w, c in zip(self.w_ids, self.costs)],
+            "default": self.default,
+            "base": self.base.params(),
+        }
@@ -0,0 +1,281 @@
+import bisect
+from typing import List, Dict, Tuple, Optional, Iterable
+
+import numpy as np
+
+from src.pkgs.structs.distance import DistanceEngine, InstanceDistances
+from src.pkgs.structs.reward_model import RewardModel, LinearPenaltyReward
+from src.pkgs.structs.task import Task
+from src.pkgs.structs.worker import Worker
+
+
+class FenwickTree:
+    """
+    prefix sums with O(log n) point updates.
+    """
+
+    def __init__(self, values: Iterable[float]):
+        self.tree = [0.0] + list(values)
+        self.n = len(self.tree) - 1
+        for i in range(1, self.n + 1):
+            j = i + (i & -i)
+            if j <= self.n:
+                self.tree[j] += self.tree[i]
+
+    def add(self, i: int, delta: float):
+        i += 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, i: int) -> float:
+        """
+        :return: sum of the values at positions [0, i)
+        """
+        ret = 0.0
+        while i > 0:
+            ret += self.tree[i]
+            i -= i & -i
+        return ret
+
+    def search(self, k: float) -> int:
+        """
+        values must be non-negative.
+        :return: the smallest position p such that prefix_sum(p + 1) >= k
+        """
+        pos = 0
+        step = 1 << self.n.bit_length()
+        while step > 0:
+            if pos + step <= self.n and self.tree[pos + step] < k:
+                pos += step
+                k -= self.tree[pos]
+            step >>= 1
+        return pos
+
+
+class TaskCandidates:
+    """
+    eligible workers of one task, sorted by travel time, with prefix sums over the present ones.
+
+    finish_time(m) = (sum of the m smallest travel times + workload) / m.
+    adding the (m + 1)-th worker averages finish_time(m) with its travel time, so finish_time
+    decreases until the next travel time reaches it and never decreases again:
+    the best team is found by binary search.
+
+    with pair costs the reward of every prefix is computed at once instead,
+    the best prefix is only a heuristic then.
+    """
+
+    def __init__(
+        self,
+        task: Task,
+        workers: List[Worker],
+        travel: List[float],
+        reward_model: Optional[RewardModel] = None,
+    ):
+        self.task = task
+        self.workers = workers
+        self.travel = travel
+        self.reward_model = LinearPenaltyReward() if reward_model is None else reward_model
+        if self.reward_model.has_pair_costs:
+            self.travel_array = np.array(travel)
+            self.costs = self.reward_model.pair_costs(
+                self.travel_array, np.array([w.id for w in workers], dtype=np.int64)
+            )
+        self.position = {w.id: p for p, w in enumerate(workers)}
+        self.present = [True] * len(workers)
+        self.n = len(workers)
+        self.counts = FenwickTree([1.0] * len(workers))
+        self.sums = FenwickTree(travel)
+
+        # memoized best (reward, team size, position of the last team member, finish time)
+        self.best: Optional[Tuple[float, int, int, float]] = None
+
+    def remove(self, w_id: int):
+        p = self.position[w_id]
+        if not self.present[p]:
+            return
+        self.present[p] = False
+        self.n -= 1
+        self.counts.add(p, -1.0)
+        self.sums.add(p, -self.travel[p])
+
+        # without pair costs, workers after the best team don't change it
+        if self.best is not None and (p <= self.best[2] or self.reward_model.has_pair_costs):
+            self.best = None
+
+    def add(self, w_id: int):
+        p = self.position[w_id]
+        if self.present[p]:
+            return
+        self.present[p] = True
+        self.n += 1
+        self.counts.add(p, 1.0)
+        self.sums.add(p, self.travel[p])
+
+        # without pair costs, only workers faster than the current finish time improve the best team
+        if self.best is not None and (
+            p <= self.best[2] or self.travel[p] < self.best[3] or self.reward_model.has_pair_costs
+        ):
+            self.best = None
+
+    def finish_time(self, m: int) -> Tuple[float, float, int]:
+        """
+        :return: finish time of the first m present workers, travel time of the (m + 1)-th one
+                 (inf if none) and its position
+        """
+        if m < self.n:
+            p = self.counts.search(m + 1)
+            return (self.sums.prefix_sum(p) + self.task.workload) / m, self.travel[p], p
+        return (
+            (self.sums.prefix_sum(len(self.travel)) + self.task.workload) / m,
+            float("inf"),
+            len(self.travel),
+        )
+
+    def reward(self, finish_time: float) -> float:
+        t = self.task
+        return float(
+            self.reward_model.curve(finish_time, t.deadline, t.expected_time, t.penalty_rate, t.reward)
+        )
+
+    def best_team(self) -> Tuple[float, int, int, float]:
+        """
+        :return: reward, team size, position of the last team member, finish time
+        """
+        if self.best is not None:
+            return self.best
+        if self.n == 0:
+            self.best = (0.0, 0, -1, float("inf"))
+            return self.best
+        if self.reward_model.has_pair_costs:
+            self.best = self._best_prefix()
+            return self.best
+
+        # smallest m whose next worker doesn't lower the finish time
+        lo, hi = 1, self.n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            finish_time, next_travel, _ = self.finish_time(mid)
+            if next_travel >= finish_time:
+                hi = mid
+            else:
+                lo = mid + 1
+        best_reward = self.reward(self.finish_time(lo)[0])
+
+        # the reward doesn't decrease along [1, lo], use the smallest team reaching the best reward
+        hi = lo
+        lo = 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.reward(self.finish_time(mid)[0]) >= best_reward:
+                hi = mid
+            else:
+                lo = mid + 1
+
+        self.best = (best_reward, lo, self.counts.search(lo), self.finish_time(lo)[0])
+        return self.best
+
+    def _best_prefix(self) -> Tuple[float, int, int, float]:
+        """
+        reward minus costs of every prefix of the present workers, the smallest best one.
+        """
+        t = self.task
+        pos = np.flatnonzero(self.present)
+        finish_time = (np.cumsum(self.travel_array[pos]) + t.workload) / np.arange(1, len(pos) + 1)
+        net = self.reward_model.curve(
+            finish_time, t.deadline, t.expected_time, t.penalty_rate, t.reward
+        ) - np.cumsum(self.costs[pos])
+        k = int(np.argmax(net))
+        return float(net[k]), k + 1, int(pos[k]), float(finish_time[k])
+
+    def team(self) -> List[Worker]:
+        _, m, last, _ = self.best_team()
+        return [self.workers[p] for p in range(last + 1) if self.present[p]][:m]
+
+
+class TeamFormation:
+    """
+    best team and reward of every task over a changing pool of workers.
+
+    1. every task keeps its eligible workers sorted by travel time, with prefix sums.
+    2. removing a worker, or adding back a worker known at construction, is O(log k) per eligible task.
+    3. best_team() is memoized and only recomputed, in O(log^2 k), when a change can affect it.
+    """
+
+    def __init__(
+        self,
+        workers: List[Worker],
+        tasks: List[Task],
+        reward_model: Optional[RewardModel] = None,
+        engine: Optional[DistanceEngine] = None,
+    ):
+        self.workers = {w.id: w for w in workers}
+        self.tasks = {t.id: t for t in tasks}
+        self.reward_model = reward_model
+        self.engine = DistanceEngine() if engine is None else engine
+        self.candidates: Dict[int, TaskCandidates] = dict()
+        self.worker_tasks: Dict[int, List[int]] = {w.id: list() for w in workers}
+
+        distances = self.engine.instance(workers, tasks)
+        for j, t in enumerate(tasks):
+            w_idx, travel = self._eligible(distances, j)
+            self.candidates[t.id] = TaskCandidates(
+                t, [workers[i] for i in w_idx], travel.tolist(), self.reward_model
+            )
+            for i in w_idx:
+                self.worker_tasks[workers[i].id].append(t.id)
+
+    @staticmethod
+    def _eligible(distances: InstanceDistances, j: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: positions and travel times of the eligible workers of the j-th task, sorted by travel time
+        """
+        eligible = np.flatnonzero(distances.eligible[:, j])
+        travel = distances.travel[eligible, j]
+        order = np.argsort(travel, kind="stable")
+        return eligible[order], travel[order]
+
+    def remove_worker(self, w_id: int):
+        for t_id in self.worker_tasks[w_id]:
+            self.candidates[t_id].remove(w_id)
+
+    def add_worker(self, w: Worker):
+        """
+        O(log k) per eligible task for workers known at construction,
+        new workers rebuild the candidates of their eligible tasks.
+        """
+        if w.id in self.worker_tasks:
+            for t_id in self.worker_tasks[w.id]:
+                self.candidates[t_id].add(w.id)
+            return
+
+        self.workers[w.id] = w
+        self.worker_tasks[w.id] = list()
+        tasks = list(self.tasks.values())
+        distances = self.engine.instance([w], tasks, cache=False)
+        for j in np.flatnonzero(distances.eligible[0]):
+            c = self.candidates[tasks[j].id]
+            travel = float(distances.travel[0, j])
+            # after the workers with the same travel time, like a stable sort
+            p = bisect.bisect_right(c.travel, travel)
+            self.candidates[tasks[j].id] = TaskCandidates(
+                tasks[j],
+                c.workers[:p] + [w] + c.workers[p:],
+                c.travel[:p] + [travel] + c.travel[p:],
+                self.reward_model,
+            )
+            for q, x in enumerate(c.workers):
+                if not c.present[q]:
+                    self.candidates[tasks[j].id].remove(x.id)
+            self.worker_tasks[w.id].append(tasks[j].id)
+
+    def best_reward(self, t_id: int) -> float:
+        return self.candidates[t_id].best_team()[0]
+
+    def best_team(self, t_id: int) -> Tuple[float, List[Worker]]:
+        """
+        :return: best reward of the task with the present workers, net of pair costs, smallest team reaching it
+        """
+        c = self.candidates[t_id]
+        return c.best_team()[0], c.team()
@@ -1,22 +1,29 @@
-import math
-from typing import List, Iterable
+from typing import List, Iterable, Optional
 
+import numpy as np
+
+from src.pkgs.structs.distance import DistanceEngine, EuclideanMetric
 from src.pkgs.structs.task import Task
 from src.pkgs.structs.worker import Worker
 
 
 def travel_time(
-    lat_1: float, lon_1: float, lat_2: float, lon_2: float, v: float
+    lat_1: float, lon_1: float, lat_2: float, lon_2: float, v: float, engine: Optional[DistanceEngine] = None
 ) -> float:
-    return math.sqrt((lat_1 - lat_2) ** 2 + (lon_1 - lon_2) ** 2) / v
+    """
+    :param engine: distance engine, euclidean on the degrees if None.
+    """
+    metric = EuclideanMetric() if engine is None else engine.metric
+    return metric.scalar_distance(lat_1, lon_1, lat_2, lon_2) / v
 
 
-def is_worker_available(w: Worker, t: Task) -> bool:
+def is_worker_available(w: Worker, t: Task, engine: Optional[DistanceEngine] = None) -> bool:
     """
     give a worker and a task, check if the worker is
     available to the task
     :param w:
     :param t:
+    :param engine: distance engine, euclidean on the degrees if None.
     :return:
     """
     # out of workers range
@@ -26,30 +33,41 @@ def is_worker_available(w: Worker, t: Task) -> bool:
         return False
 
     # no contribution
-    if travel_time(w.lat, w.lon, t.lat, t.lon, w.velocity) > t.deadline:
+    if travel_time(w.lat, w.lon, t.lat, t.lon, w.velocity, engine) > t.deadline:
         return False
 
     return True
 
 
-def get_sorted_available_workers(workers: Iterable[Worker], t: Task) -> List[Worker]:
+def get_sorted_available_workers(
+    workers: Iterable[Worker], t: Task, engine: Optional[DistanceEngine] = None
+) -> List[Worker]:
     """
     given multiple workers and a task, return a list of
     available workers asc sorted by travel_time
     :param workers:
     :param t:
+    :param engine: distance engine, euclidean on the degrees if None.
     :return:
     """
-    ret = list()
-    for w in workers:
-        if is_worker_available(w, t):
-            ret.append(w)
+    # out of workers range, cheap enough to skip the arrays
+    workers = [
+        w for w in workers
+        if w.min_lat <= t.lat <= w.max_lat and w.min_lon <= t.lon <= w.max_lon
+    ]
+    if len(workers) == 0:
+        return list()
 
-    ret.sort(key=lambda x: travel_time(x.lat, x.lon, t.lat, t.lon, x.velocity))
-    return ret
+    lat, lon, v = np.array([(w.lat, w.lon, w.velocity) for w in workers], dtype=np.float64).T
+    travel = (DistanceEngine() if engine is None else engine).pair_travel_times(lat, lon, t.lat, t.lon, v)
+    eligible = np.flatnonzero(travel <= t.deadline)
+    order = eligible[np.argsort(travel[eligible], kind="stable")]
+    return [workers[i] for i in order]
 
 
-def get_finish_time(workers: Iterable[Worker], t: Task) -> float:
+def get_finish_time(
+    workers: Iterable[Worker], t: Task, engine: Optional[DistanceEngine] = None
+) -> float:
     """
     given multiple workers and a task, compute the finish time.
 
@@ -60,13 +78,14 @@ def get_finish_time(workers: Iterable[Worker], t: Task) -> float:
         finish_time * worker_num = total_travel_time + task's work_load
     :param workers:
     :param t:
+    :param engine: distance engine, euclidean on the degrees if None.
     :return:
     """
     total_travel = 0.0
     w_cnt = 0
 
     for w in workers:
-        travel_time(w.lat, w.lon, t.lat, t.lon, w.velocity)
+        total_travel += travel_time(w.lat, w.lon, t.lat, t.lon, w.velocity, engine)
         w_cnt += 1
 
     return (total_travel + t.workload) / w_cnt
@@ -0,0 +1,51 @@
+import os
+import pathlib
+from typing import List, Tuple
+
+import pandas as pd
+import pytest
+from pulp import CPLEX_CMD, PULP_CBC_CMD
+
+from src.pkgs.sovlers import mip_solver
+from src.pkgs.structs.task import Task
+from src.pkgs.structs.worker import Worker
+
+RESOURCE_PATH = os.path.join(pathlib.Path(__file__).parents[1], "resources/processed_data")
+
+
+def read_instance(
+    instance_id: int = 100, i: int = 0, worker_size: int = 12, task_size: int = 6
+) -> Tuple[List[Worker], List[Task]]:
+    """
+    the first workers and tasks of a processed instance, as main.py reads them.
+    """
+    workers = [
+        Worker.from_pd_series(w_id, pd_ser)
+        for w_id, pd_ser in pd.read_csv(
+            os.path.join(RESOURCE_PATH, f"worker_{instance_id}/workers{i}.csv")
+        ).iterrows()
+    ]
+    tasks = [
+        Task.from_pd_series(t_id, pd_ser)
+        for t_id, pd_ser in pd.read_csv(
+            os.path.join(RESOURCE_PATH, f"task_{instance_id}/tasks{i}.csv")
+        ).iterrows()
+    ]
+    return workers[:worker_size], tasks[:task_size]
+
+
+@pytest.fixture
+def mip_backend(monkeypatch):
+    """
+    cplex if it is installed, otherwise the cbc bundled with pulp solves the same lp.
+    """
+    if CPLEX_CMD().available():
+        return "cplex"
+    if not PULP_CBC_CMD().available():
+        pytest.skip("no mip solver available")
+    monkeypatch.setattr(
+        mip_solver,
+        "ProfiledCPLEX_CMD",
+        lambda profiler, msg, gapRel, warmStart: PULP_CBC_CMD(msg=msg, gapRel=gapRel, warmStart=warmStart),
+    )
+    return "cbc"
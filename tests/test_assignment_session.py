@@ -0,0 +1,98 @@
+import pytest
+
+from src.pkgs.sovlers.assignment_session import AssignmentSession
+from src.pkgs.sovlers.base_solver import BaseSolver
+from src.pkgs.sovlers.mip_solver import MIPSolver
+from src.pkgs.structs.evaluator import SolutionEvaluator
+from tests.conftest import read_instance
+
+GAP_REL = 1e-6
+
+
+def full_solve(session: AssignmentSession):
+    return MIPSolver(
+        list(session.workers.values()), list(session.tasks.values()), gap_rel=GAP_REL
+    ).solve()
+
+
+def check_solution(session: AssignmentSession, reward: float, assignments):
+    """
+    the assignments are feasible for the current pools and earn the reported reward.
+    """
+    w_ids = [x[0] for x in assignments]
+    assert len(w_ids) == len(set(w_ids))
+    assert set(w_ids) <= session.workers.keys()
+    assert {x[1] for x in assignments} <= session.tasks.keys()
+
+    evaluation = SolutionEvaluator(
+        list(session.workers.values()),
+        list(session.tasks.values()),
+        session.reward_model,
+        BaseSolver.distance,
+    ).evaluate(assignments)
+    assert evaluation.feasible
+    assert reward == pytest.approx(evaluation.reward)
+
+
+def test_first_solve_matches_full_solve(mip_backend):
+    workers, tasks = read_instance(worker_size=30, task_size=12)
+    session = AssignmentSession(workers, tasks, gap_rel=GAP_REL)
+
+    reward, solved, _, assignments = session.solve()
+    check_solution(session, reward, assignments)
+    # every task is dirty, the session solves the full instance
+    assert reward == pytest.approx(full_solve(session)[0], rel=1e-4)
+    assert len(session.dirty) == 0
+
+
+@pytest.mark.parametrize("change", ["remove_task", "remove_worker", "add_worker", "add_task"])
+def test_re_solve_after_change(mip_backend, change):
+    workers, tasks = read_instance(worker_size=30, task_size=13)
+    # a worker of the optimal solution joins later
+    w_id = MIPSolver(workers, tasks[:12], gap_rel=GAP_REL).solve()[3][0][0]
+    added = next(w for w in workers if w.id == w_id)
+    session = AssignmentSession([w for w in workers if w.id != w_id], tasks[:12], gap_rel=GAP_REL)
+    session.solve()
+
+    if change == "remove_task":
+        t_id = next(t_id for t_id, team in session.teams.items() if len(team) > 0)
+        session.remove_task(t_id)
+    elif change == "remove_worker":
+        session.remove_worker(next(iter(session.assigned)))
+    elif change == "add_worker":
+        session.add_worker(added)
+    else:
+        session.add_task(tasks[12])
+
+    assert len(session.dirty) > 0
+    reward, solved, _, assignments = session.solve()
+    check_solution(session, reward, assignments)
+    assert len(session.dirty) == 0
+    assert solved == sum(1 for x in session.rewards.values() if x > 0)
+
+    # untouched teams are kept, so the session can only trail a full re-solve
+    full_reward = full_solve(session)[0]
+    assert reward <= full_reward * (1 + 1e-4) + 1e-9
+
+
+def test_failed_solve_keeps_teams(mip_backend, monkeypatch):
+    workers, tasks = read_instance(worker_size=30, task_size=12)
+    session = AssignmentSession(workers, tasks, gap_rel=GAP_REL)
+    session.solve()
+    # the rest of its team is re-solved
+    t_id = next(t_id for t_id, team in session.teams.items() if len(team) > 1)
+    session.remove_worker(next(iter(session.teams[t_id])))
+    teams = {k: set(v) for k, v in session.teams.items()}
+    assigned = dict(session.assigned)
+    dirty = set(session.dirty)
+
+    def fail(self):
+        raise RuntimeError("solver failed")
+
+    monkeypatch.setattr(MIPSolver, "_mip_solve", fail)
+    with pytest.raises(RuntimeError):
+        session.solve()
+    assert session.teams == teams
+    assert session.assigned == assigned
+    # retried at the next solve
+    assert session.dirty == dirty
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.pkgs.service.dispatch_service import DispatchService, LocalClient
+from src.pkgs.sovlers.base_solver import BaseSolver
+from tests.conftest import read_instance
+
+
+class CountingSolver(BaseSolver):
+    """
+    assigns every worker to the first task, counts its solves.
+    """
+
+    calls = 0
+    lock = threading.Lock()
+
+    def _solve(self):
+        with self.lock:
+            type(self).calls += 1
+        return 1.0, 1, 0.0, [(w.id, self.tasks[0].id) for w in self.workers]
+
+
+class BlockingSolver(CountingSolver):
+    release = threading.Event()
+
+    def _solve(self):
+        self.release.wait(5)
+        return super()._solve()
+
+
+class FailingSolver(BaseSolver):
+    def _solve(self):
+        raise RuntimeError("solver failed")
+
+
+@pytest.fixture(autouse=True)
+def reset_solvers():
+    CountingSolver.calls = 0
+    BlockingSolver.release = threading.Event()
+
+
+def test_identical_requests_are_solved_once():
+    workers, tasks = read_instance()
+
+    async def run():
+        service = DispatchService(CountingSolver, batch_window=0.1)
+        async with LocalClient(service) as client:
+            results = await asyncio.gather(*[client.assign(workers, tasks) for _ in range(4)])
+        return service, results
+
+    service, results = asyncio.run(run())
+    assert CountingSolver.calls == 1
+    assert service.metrics()["coalesced"] == 3
+    assert all(x == results[0] for x in results)
+    # every caller owns its assignments
+    results[0][3].clear()
+    assert all(len(x[3]) == len(workers) for x in results[1:])
+    assert service.executor is None
+
+
+def test_different_requests_are_solved_apart():
+    workers, tasks = read_instance()
+
+    async def run():
+        service = DispatchService(CountingSolver, batch_window=0.1)
+        async with LocalClient(service) as client:
+            return await asyncio.gather(
+                client.assign(workers, tasks), client.assign(workers[:-1], tasks)
+            )
+
+    results = asyncio.run(run())
+    assert CountingSolver.calls == 2
+    assert len(results[0][3]) == len(workers)
+    assert len(results[1][3]) == len(workers) - 1
+
+
+def test_full_queue_rejects_non_blocking_requests():
+    workers, tasks = read_instance()
+
+    async def run():
+        service = DispatchService(
+            BlockingSolver, max_queue_size=1, batch_window=0.0, max_batch_size=1, concurrency=1
+        )
+        await service.start()
+        # the first request is being solved, the second waits for a slot, the third fills the queue
+        pending = list()
+        for _ in range(3):
+            pending.append(asyncio.create_task(service.submit(workers, tasks)))
+            await asyncio.sleep(0.05)
+        with pytest.raises(asyncio.QueueFull):
+            await service.submit(workers, tasks, block=False)
+
+        BlockingSolver.release.set()
+        results = await asyncio.gather(*pending)
+        await service.stop()
+        return service, results
+
+    service, results = asyncio.run(run())
+    assert len(results) == 3
+    metrics = service.metrics()
+    assert metrics["rejected"] == 1
+    assert metrics["requests"] == 3
+
+
+def test_solver_errors_reach_every_caller():
+    workers, tasks = read_instance()
+
+    async def run():
+        service = DispatchService(FailingSolver, batch_window=0.1)
+        async with LocalClient(service) as client:
+            return await asyncio.gather(
+                client.assign(workers, tasks), client.assign(workers, tasks), return_exceptions=True
+            )
+
+    results = asyncio.run(run())
+    assert len(results) == 2
+    assert all(isinstance(x, RuntimeError) for x in results)
+
+
+def test_errors_before_the_solve_reach_the_caller():
+    workers, tasks = read_instance()
+
+    async def run():
+        service = DispatchService(CountingSolver)
+        async with LocalClient(service) as client:
+            # the fingerprint fails on invalid tasks
+            with pytest.raises(TypeError):
+                await client.assign(workers, [object()])
+            # the service keeps serving
+            return await client.assign(workers, tasks)
+
+    assert asyncio.run(run())[0] == 1.0
@@ -0,0 +1,78 @@
+import dataclasses
+import heapq
+
+from src.pkgs.simulation.simulation import ARRIVAL, EPOCH, EXPIRY, RELEASE, Simulation
+from src.pkgs.sovlers.greedy_by_reward_solver import GreedyByRewardSolver
+from tests.conftest import read_instance
+
+
+class NeverAssigns(GreedyByRewardSolver):
+    def _solve(self):
+        return 0.0, 0, 0.0, list()
+
+
+def test_same_time_events_are_ordered_by_kind_then_push_order():
+    _, tasks = read_instance()
+    simulation = Simulation([], [], epoch_length=1.0)
+    simulation.events = list()
+    for kind, payload in [(EPOCH, None), (EXPIRY, 1), (ARRIVAL, tasks[0]), (RELEASE, "a"), (RELEASE, "b")]:
+        simulation._push(1.0, kind, payload)
+    simulation._push(0.5, EPOCH, None)
+
+    popped = [heapq.heappop(simulation.events) for _ in range(len(simulation.events))]
+    assert [(x[0], x[1], x[3]) for x in popped] == [
+        (0.5, EPOCH, None),
+        (1.0, RELEASE, "a"),
+        (1.0, RELEASE, "b"),
+        (1.0, ARRIVAL, tasks[0]),
+        (1.0, EXPIRY, 1),
+        (1.0, EPOCH, None),
+    ]
+
+
+def test_task_arriving_at_an_epoch_is_dispatched_in_it():
+    workers, tasks = read_instance()
+    report = Simulation(workers, [(1.0, tasks[0])], epoch_length=1.0).run(until=1.0)
+
+    assert [x.time for x in report.epochs] == [1.0]
+    assert report.epochs[0].arrived_tasks == 1
+    assert report.epochs[0].pending_tasks == 1
+
+
+def test_task_expiring_at_an_epoch_is_not_dispatched():
+    workers, tasks = read_instance()
+    t = dataclasses.replace(tasks[0], deadline=1.0, expected_time=1.0)
+    # the task arrives at the first epoch and expires at the second one
+    report = Simulation(workers, [(1.0, t)], epoch_length=1.0, solver=NeverAssigns).run()
+
+    assert [(x.time, x.pending_tasks, x.expired_tasks) for x in report.epochs] == [(1.0, 1, 0), (2.0, 0, 1)]
+
+
+def test_workers_released_at_an_epoch_are_free_in_it():
+    workers, tasks = read_instance()
+    simulation = Simulation(workers[:2], [(1.0, tasks[1])], epoch_length=1.0, solver=NeverAssigns)
+    # the first worker is busy on a task finishing at the first epoch
+    w = simulation.free.pop(workers[0].id)
+    simulation.busy_workers, simulation.busy_tasks = 1, 1
+    simulation._push(1.0, RELEASE, (tasks[0], [w]))
+    report = simulation.run(until=1.0)
+
+    assert [(x.free_workers, x.completed_tasks) for x in report.epochs] == [(2, 1)]
+    # at the location of its last task
+    released = simulation.free[w.id]
+    assert (released.lat, released.lon) == (tasks[0].lat, tasks[0].lon)
+
+
+def test_every_task_completes_or_expires():
+    workers, tasks = read_instance(worker_size=30, task_size=12)
+    simulation = Simulation(workers, [(0.5 * j, t) for j, t in enumerate(tasks)], epoch_length=1.0)
+    summary = simulation.run().summary()
+
+    assert summary["arrived"] == len(tasks)
+    assert summary["assigned"] > 0
+    assert summary["completed"] == summary["assigned"]
+    assert summary["completed"] + summary["expired"] == len(tasks)
+    # every team is back once the simulation is done
+    assert len(simulation.free) == len(workers)
+    assert simulation.busy_workers == 0 and simulation.busy_tasks == 0
+
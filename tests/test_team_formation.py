@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from src.pkgs.structs.distance import DistanceEngine
+from src.pkgs.structs.reward_model import LinearPenaltyReward
+from src.pkgs.structs.team_formation import FenwickTree, TeamFormation
+from tests.conftest import read_instance
+
+
+def brute_force(formation: TeamFormation, t_id: int, present: set) -> float:
+    """
+    best reward over every prefix of the present eligible workers, sorted by travel time.
+    """
+    c = formation.candidates[t_id]
+    t = c.task
+    travel = [x for w, x in zip(c.workers, c.travel) if w.id in present]
+    best = 0.0
+    for m in range(1, len(travel) + 1):
+        finish_time = (sum(travel[:m]) + t.workload) / m
+        best = max(
+            best,
+            float(LinearPenaltyReward().curve(finish_time, t.deadline, t.expected_time, t.penalty_rate, t.reward)),
+        )
+    return best
+
+
+def test_fenwick_tree():
+    values = [3.0, 0.0, 1.0, 4.0, 1.0, 5.0]
+    tree = FenwickTree(values)
+    assert [tree.prefix_sum(i) for i in range(len(values) + 1)] == [0.0, 3.0, 3.0, 4.0, 8.0, 9.0, 14.0]
+    tree.add(1, 2.0)
+    assert tree.prefix_sum(2) == 5.0
+    # smallest p with prefix_sum(p + 1) >= k
+    assert tree.search(5.0) == 1
+    assert tree.search(5.5) == 2
+    assert tree.search(14.0) == 5
+
+
+def test_best_team_matches_prefix_scan_under_churn():
+    workers, tasks = read_instance(worker_size=60, task_size=30)
+    formation = TeamFormation(workers, tasks, engine=DistanceEngine())
+    present = {w.id for w in workers}
+    rng = random.Random(0)
+
+    for _ in range(200):
+        w = rng.choice(workers)
+        if w.id in present:
+            formation.remove_worker(w.id)
+            present.discard(w.id)
+        else:
+            formation.add_worker(w)
+            present.add(w.id)
+
+        t = rng.choice(tasks)
+        reward, team = formation.best_team(t.id)
+        assert reward == pytest.approx(brute_force(formation, t.id, present), abs=1e-9)
+        # the team earns the best reward
+        assert {x.id for x in team} <= present
+        if len(team) > 0:
+            c = formation.candidates[t.id]
+            finish_time = (sum(c.travel[c.position[x.id]] for x in team) + t.workload) / len(team)
+            assert c.reward(finish_time) == pytest.approx(reward, abs=1e-9)
+
+
+def test_new_workers_join_the_candidates():
+    workers, tasks = read_instance(worker_size=60, task_size=30)
+    formation = TeamFormation(workers[:40], tasks, engine=DistanceEngine())
+    for w in workers[40:]:
+        formation.add_worker(w)
+
+    present = {w.id for w in workers}
+    full = TeamFormation(workers, tasks, engine=DistanceEngine())
+    for t in tasks:
+        assert formation.best_reward(t.id) == pytest.approx(full.best_reward(t.id), abs=1e-9)
+        assert formation.best_reward(t.id) == pytest.approx(brute_force(full, t.id, present), abs=1e-9)